@@ -1,3 +1,4 @@
 from . import main
 
-main.start()
\ No newline at end of file
+if __name__ == '__main__':  # not again in spawned worker processes
+    main.start()
@@ -0,0 +1,445 @@
+"""
+Geometry kernels over flat mesh buffers, with an optional NumPy backend.
+
+Spinny only needs the Standard Library. The functions here work on the
+array('d') buffers of a spinny.mesh.Mesh (x, y, z back to back). If NumPy
+happens to be installed, they view those buffers as (N,3) arrays without
+copying and run as vectorized array operations instead of Python loops.
+
+Set SPINNY_NUMPY=0 in the environment to force the stdlib path.
+"""
+import os
+from array import array
+
+from spinny.camera import (
+    NEAR, FAR, LEFT, RIGHT, BOTTOM, TOP,
+    GUARD, GUARD_LEFT, GUARD_RIGHT, GUARD_BOTTOM, GUARD_TOP,
+)
+from spinny.matrix import Matrix4
+
+try:
+    import numpy as np
+except ImportError:  # no NumPy, stdlib path it is
+    np = None
+
+
+NUMPY = np is not None and os.environ.get('SPINNY_NUMPY', '1') != '0'
+
+
+def view(buf):
+    """
+    View a flat xyz buffer as an (N,3) array. Writes go to the buffer.
+    :param buf: array('d')
+    :return: ndarray
+    """
+    return np.frombuffer(buf, dtype=float).reshape(-1, 3)
+
+
+def transform(buf, m):
+    """
+    Apply a matrix to every xyz triple of buf, in place.
+    A 4x4 matrix is a homogeneous transform: points are translated (and
+    divided by w, for perspective) in the same pass.
+    :param buf: array('d')
+    :param m: Matrix, 3x3 or 4x4
+    """
+    if not buf:
+        return
+    if m.size == (4, 4):
+        _transform4(buf, m)
+        return
+    if NUMPY:
+        v = view(buf)
+        v[:] = v @ np.array(m._value, dtype=float).T
+        return
+    (a0, a1, a2), (b0, b1, b2), (c0, c1, c2) = m._value
+    it = iter(buf)
+    res = array('d')
+    extend = res.extend
+    for x, y, z in zip(it, it, it):
+        extend((
+            a0*x + a1*y + a2*z,
+            b0*x + b1*y + b2*z,
+            c0*x + c1*y + c2*z,
+        ))
+    buf[:] = res
+
+
+def _transform4(buf, m):
+    """transform with a 4x4 homogeneous matrix."""
+    affine = m.is_affine
+    if NUMPY:
+        v = view(buf)
+        rows = np.array(m._value, dtype=float)
+        res = v @ rows[:3, :3].T + rows[:3, 3]
+        if not affine:
+            res /= (v @ rows[3, :3] + rows[3, 3])[:, None]
+        v[:] = res
+        return
+    (a0, a1, a2, a3), (b0, b1, b2, b3), (c0, c1, c2, c3), (d0, d1, d2, d3) = m._value
+    it = iter(buf)
+    res = array('d')
+    extend = res.extend
+    if affine:
+        for x, y, z in zip(it, it, it):
+            extend((
+                a0*x + a1*y + a2*z + a3,
+                b0*x + b1*y + b2*z + b3,
+                c0*x + c1*y + c2*z + c3,
+            ))
+    else:
+        for x, y, z in zip(it, it, it):
+            w = d0*x + d1*y + d2*z + d3
+            extend((
+                (a0*x + a1*y + a2*z + a3) / w,
+                (b0*x + b1*y + b2*z + b3) / w,
+                (c0*x + c1*y + c2*z + c3) / w,
+            ))
+    buf[:] = res
+
+
+def move_by(buf, pos):
+    """
+    Add a Vector to every xyz triple of buf, in place.
+    :param buf: array('d')
+    :param pos: Vector
+    """
+    if not buf:
+        return
+    if NUMPY:
+        view(buf)[:] += pos._value
+        return
+    for i, d in enumerate(pos._value):
+        buf[i::3] = array('d', [a + d for a in buf[i::3]])
+
+
+def expand(buf, models, offsets=None):
+    """
+    Place transformed copies of an xyz buffer back to back, one per model.
+    :param buf: array('d')
+    :param models: list of Matrix3
+    :param offsets: list of Vector3 to move copies by (None for directions)
+    :return: array('d'), len(models) times as long as buf
+    """
+    if not buf or not models:
+        return array('d')
+    if NUMPY:
+        res = np.einsum(
+            'kij,vj->kvi', np.array([m._value for m in models], dtype=float), view(buf),
+        )
+        if offsets is not None:
+            res += np.array([o._value for o in offsets], dtype=float)[:, None, :]
+        return array('d', res.tobytes())
+    res = array('d')
+    for i, m in enumerate(models):
+        part = array('d', buf)
+        if offsets is None:
+            transform(part, m)
+        else:
+            _transform4(part, Matrix4.affine(m, offsets[i]))  # turn and move in one pass
+        res.extend(part)
+    return res
+
+
+def repeat(ints, count, stride, start=0):
+    """
+    Place copies of an int buffer back to back, adding start to the first,
+    start+stride to the second and so on (e.g. face indices of instances).
+    :param ints: array('i')
+    :param count: int, number of copies
+    :param stride: int, added per copy
+    :param start: int, added to every copy
+    :return: array('i'), count times as long as ints
+    """
+    if not ints or count <= 0:
+        return array('i')
+    if NUMPY:
+        shifts = np.arange(count, dtype=np.intc)*stride + start
+        res = (shifts[:, None] + np.frombuffer(ints, dtype=np.intc)).astype(np.intc)
+        return array('i', res.tobytes())
+    res = array('i')
+    for k in range(count):
+        shift = start + k*stride
+        res.extend([i + shift for i in ints])
+    return res
+
+
+def spheres_in(centres, radii, planes):
+    """
+    Find spheres that aren't completely outside any of the planes.
+    :param centres: array('d'), x, y, z of each sphere centre
+    :param radii: array('d'), radius of each sphere
+    :param planes: list of (x, y, z, d) planes with unit normals pointing
+        in, see camera.Projector.planes
+    :return: list of sphere indices, in order
+    """
+    if NUMPY:
+        if not radii:
+            return []
+        p = np.array(planes, dtype=float)
+        dist = view(centres) @ p[:, :3].T + p[:, 3]
+        r = np.frombuffer(radii, dtype=float)
+        return np.flatnonzero((dist >= -r[:, None]).all(axis=1)).tolist()
+    res = []
+    for i, r in enumerate(radii):
+        x, y, z = centres[3*i], centres[3*i+1], centres[3*i+2]
+        for a, b, c, d in planes:
+            if a*x + b*y + c*z + d < -r:
+                break  # completely outside this plane
+        else:
+            res.append(i)
+    return res
+
+
+def face_geometry(coords, index, offsets):
+    """
+    Compute unit normals (Newell's method) and centres of all faces at once.
+    Faces are wound counter-clockwise seen from the front.
+    :param coords: array('d'), x, y, z of each vertex
+    :param index: array('i'), vertex indices of all faces, back to back
+    :param offsets: array('i'), face f uses index[offsets[f]:offsets[f+1]]
+    :return: (normals, centres), both array('d') with x, y, z of each face
+    """
+    count = len(offsets) - 1
+    normals = array('d', bytes(24*count))
+    centres = array('d', bytes(24*count))
+    if not count:
+        return normals, centres
+    if NUMPY:
+        starts = np.frombuffer(offsets, dtype=np.intc)
+        corners = view(coords)[np.frombuffer(index, dtype=np.intc)]
+        following = np.arange(1, len(index)+1)  # next corner of the same face
+        following[starts[1:]-1] = starts[:-1]
+        crosses = np.cross(corners, corners[following])
+        n = np.add.reduceat(crosses, starts[:-1])
+        length = np.linalg.norm(n, axis=1)
+        length[length == 0] = 1  # degenerate face, leave it zero
+        view(normals)[:] = n / length[:, None]
+        view(centres)[:] = np.add.reduceat(corners, starts[:-1]) / np.diff(starts)[:, None]
+        return normals, centres
+
+    for f in range(count):
+        start, end = offsets[f], offsets[f+1]
+        nx = ny = nz = sx = sy = sz = 0.0
+        j = 3*index[end-1]
+        x0, y0, z0 = coords[j], coords[j+1], coords[j+2]
+        for k in range(start, end):
+            j = 3*index[k]
+            x1, y1, z1 = coords[j], coords[j+1], coords[j+2]
+            nx += y0*z1 - z0*y1
+            ny += z0*x1 - x0*z1
+            nz += x0*y1 - y0*x1
+            sx += x1
+            sy += y1
+            sz += z1
+            x0, y0, z0 = x1, y1, z1
+        length = (nx*nx + ny*ny + nz*nz) ** 0.5 or 1
+        n = end - start
+        i = 3*f
+        normals[i:i+3] = array('d', (nx/length, ny/length, nz/length))
+        centres[i:i+3] = array('d', (sx/n, sy/n, sz/n))
+    return normals, centres
+
+
+def triangulate(index, offsets):
+    """
+    Fan every face into triangles around its first corner.
+    :param index: array('i'), vertex indices of all faces, back to back
+    :param offsets: array('i'), face f uses index[offsets[f]:offsets[f+1]]
+    :return: (tris, starts), tris array('i') with 3 vertex indices per
+        triangle, starts array('i') where face f has triangles starts[f]
+        to starts[f+1]
+    """
+    if NUMPY and len(offsets) > 1:
+        offs = np.frombuffer(offsets, dtype=np.intc)
+        idx = np.frombuffer(index, dtype=np.intc)
+        counts = np.maximum(np.diff(offs) - 2, 0)  # triangles per face
+        starts = np.zeros(len(offs), dtype=np.intc)
+        np.cumsum(counts, out=starts[1:])
+        face = np.repeat(np.arange(len(counts)), counts)
+        first = offs[face]
+        k = np.arange(starts[-1]) - starts[face] + first  # second corner - 1
+        tris = np.empty((len(face), 3), dtype=np.intc)
+        tris[:, 0] = idx[first]
+        tris[:, 1] = idx[k+1]
+        tris[:, 2] = idx[k+2]
+        return array('i', tris.tobytes()), array('i', starts.tobytes())
+    tris = array('i')
+    starts = array('i', (0,))
+    for f in range(len(offsets) - 1):
+        start, end = offsets[f], offsets[f+1]
+        first = index[start]
+        for i in range(start+1, end-1):
+            tris.extend((first, index[i], index[i+1]))
+        starts.append(len(tris) // 3)
+    return tris, starts
+
+
+def project(buf, projector, depth=False, codes=False):
+    """
+    Project every point to the screen.
+    :param buf: array('d') of vertex coordinates
+    :param projector: camera.Projector
+    :param depth: bool, also return 1/distance along the view
+    :param codes: bool, also return frustum outcodes (see camera.Projector)
+    :return: list of (x, y) or (x, y, 1/depth) points, and with codes
+        the outcodes (ints, as a list or an array)
+    """
+    if not NUMPY:
+        return projector.project_buffer(buf, depth, codes)
+    v = view(buf) @ np.array(projector.rows).T - projector.offset
+    x, y, z = v[:, 0], v[:, 1], v[:, 2]
+    ahead = y > projector.near
+    inv = np.zeros(len(v))
+    np.divide(1, y, out=inv, where=ahead)  # points behind go to the centre
+    s = projector.zoom * inv
+    res = np.empty((len(v), 3 if depth else 2))
+    res[:, 0] = projector.centre[0] + s*x
+    res[:, 1] = projector.centre[1] - s*z  # tk has y pointing down
+    if depth:
+        res[:, 2] = inv
+    points = res.tolist()  # plain floats, tk wants those anyway
+    if not codes:
+        return points
+
+    tx, tz = projector.tangents
+    hx = tx*y
+    hz = tz*y
+    outcodes = np.where(ahead, 0, NEAR)  # exactly the points not projected
+    outcodes |= np.where(y > projector.far, FAR, 0)
+    for c, guard, outside, beyond in (
+        (LEFT, GUARD_LEFT, x < -hx, x < -GUARD*hx),
+        (RIGHT, GUARD_RIGHT, x > hx, x > GUARD*hx),
+        (BOTTOM, GUARD_BOTTOM, z < -hz, z < -GUARD*hz),
+        (TOP, GUARD_TOP, z > hz, z > GUARD*hz),
+    ):
+        outcodes |= np.where(outside, c, 0) | np.where(outside & beyond, guard, 0)
+    return points, outcodes
+
+
+def face_codes(mesh, codes, faces):
+    """
+    Combine the outcodes of the corners of faces.
+
+    A face is out of view if its AND is not 0 (all corners outside the
+    same plane) and has to be clipped if its OR has camera.CLIP bits.
+    :param mesh: Mesh
+    :param codes: outcodes of every vertex, from project
+    :param faces: list of face indices
+    :return: (ANDs, ORs), ints of every face
+    """
+    index = mesh.index
+    offsets = mesh.offsets
+    if NUMPY:
+        f = np.asarray(faces, dtype=int)
+        if not mesh.face_count:
+            return f, f
+        starts = np.frombuffer(offsets, dtype=np.intc)[:-1]
+        corners = np.asarray(codes)[np.frombuffer(index, dtype=np.intc)]
+        return (
+            np.bitwise_and.reduceat(corners, starts)[f],
+            np.bitwise_or.reduceat(corners, starts)[f],
+        )
+    ands = []
+    ors = []
+    for f in faces:
+        a = -1
+        o = 0
+        for p in index[offsets[f]:offsets[f+1]]:
+            c = codes[p]
+            a &= c
+            o |= c
+        ands.append(a)
+        ors.append(o)
+    return ands, ors
+
+
+def visible_faces(mesh, pos, forward, faces=None):
+    """
+    Cull faces and sort the rest by distance, furthest first.
+    :param mesh: Mesh
+    :param pos: Vector, camera position
+    :param forward: Vector, camera direction
+    :param faces: sorted list of candidate face indices (default all)
+    :return: list of face indices
+    """
+    return depth_sort(*cull_faces(mesh, pos, forward, faces))
+
+
+def cull_faces(mesh, pos, forward, faces=None, codes=None):
+    """
+    Drop faces out of view or facing away from the camera.
+    :param mesh: Mesh
+    :param pos: Vector, camera position
+    :param forward: Vector, camera direction
+    :param faces: sorted list of candidate face indices (default all)
+    :param codes: outcodes of every vertex (see project), to drop faces
+        outside the view frustum. Without them only faces with their
+        centre behind the camera are dropped.
+    :return: (face indices, squared distances of their centres)
+    """
+    if faces is None:
+        faces = range(mesh.face_count)
+    if NUMPY:
+        idx = np.array(faces, dtype=int)
+        cam_to_face = view(mesh.centres)[idx] - pos._value
+        if codes is None:
+            keep = cam_to_face @ forward._value > 0  # face in front of camera
+        else:
+            keep = face_codes(mesh, codes, idx)[0] == 0  # not all outside one plane
+        keep &= np.einsum(  # and camera in front of face
+            'ij,ij->i', view(mesh.normals)[idx], cam_to_face,
+        ) < 0
+        rel = cam_to_face[keep]
+        return idx[keep], np.einsum('ij,ij->i', rel, rel)
+
+    behind = codes is None  # else the frustum test covers it
+    if not behind:
+        ands = face_codes(mesh, codes, faces)[0]
+        faces = [f for f, a in zip(faces, ands) if not a]
+    px, py, pz = pos._value
+    vx, vy, vz = forward._value
+    centres = mesh.centres
+    normals = mesh.normals
+    kept = []
+    depths = []
+    for f in faces:
+        i = 3*f
+        dx = centres[i] - px
+        dy = centres[i+1] - py
+        dz = centres[i+2] - pz
+        if behind and vx*dx + vy*dy + vz*dz <= 0:
+            continue  # face behind the camera
+        if normals[i]*dx + normals[i+1]*dy + normals[i+2]*dz >= 0:
+            continue  # camera behind face
+        kept.append(f)
+        depths.append(dx*dx + dy*dy + dz*dz)  # squared distance sorts the same
+    return kept, depths
+
+
+def depth_sort(faces, depths):
+    """
+    Order faces for the painter's algorithm, furthest first.
+    :param faces: face indices, as returned by cull_faces
+    :param depths: matching depth keys
+    :return: list of face indices
+    """
+    if NUMPY:
+        return faces[np.argsort(-depths, kind='stable')].tolist()
+    order = sorted(range(len(faces)), key=depths.__getitem__, reverse=True)
+    return [faces[i] for i in order]
+
+
+def shade_ratings(mesh, faces, sun):
+    """
+    Rate how much each face points away from the sun.
+    :param mesh: Mesh
+    :param faces: list of face indices
+    :param sun: Vector, direction of light
+    :return: list of floats, in [-1, 1] for unit directions
+    """
+    if NUMPY:
+        return (-(view(mesh.normals)[faces] @ sun._value)).tolist()
+    sx, sy, sz = sun._value
+    n = mesh.normals
+    return [-(sx*n[3*f] + sy*n[3*f+1] + sz*n[3*f+2]) for f in faces]
@@ -0,0 +1,311 @@
+"""
+Headless frame pipeline benchmark.
+
+Runs the real Spinny.draw (projection, culling, sorting, shading and
+polygon emission) against a canvas that only counts calls, so it needs
+no display. Prints a JSON report with per-frame percentiles.
+
+python3 -m spinny.bench --scene cube --n 6 --frames 300 --path orbit
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from math import cos, sin, pi, atan2
+
+from spinny import backend, cache
+from spinny.instances import Instances
+from spinny.main import Spinny
+from spinny.matrix import Vector3
+from spinny.shapes import ShapeCombination, Cube, Octagon, StickMan
+from spinny.timing import FrameTimer, percentiles
+
+
+SHAPES = {
+    'cube': Cube,
+    'octagon': Octagon,
+    'stickman': StickMan,
+}
+
+
+class NullCanvas:
+    """
+    Stands in for a tk Canvas, counting calls instead of drawing.
+
+    calls: Counter of method name -> number of calls.
+    """
+    def __init__(self):
+        self.calls = Counter()
+        self._next_id = 0
+
+    def _create(self, name):
+        self.calls[name] += 1
+        self._next_id += 1
+        return self._next_id
+
+    def create_polygon(self, *args, **kwargs):
+        return self._create('create_polygon')
+
+    def create_text(self, *args, **kwargs):
+        return self._create('create_text')
+
+    def create_oval(self, *args, **kwargs):
+        return self._create('create_oval')
+
+    def create_line(self, *args, **kwargs):
+        return self._create('create_line')
+
+    def create_image(self, *args, **kwargs):
+        return self._create('create_image')
+
+    def coords(self, *args):
+        self.calls['coords'] += 1
+
+    def itemconfig(self, *args, **kwargs):
+        self.calls['itemconfig'] += 1
+
+    def delete(self, *args):
+        self.calls['delete'] += 1
+
+    def tag_raise(self, *args):
+        self.calls['tag_raise'] += 1
+
+    def tag_lower(self, *args):
+        self.calls['tag_lower'] += 1
+
+    def bind(self, *args, **kwargs):
+        pass
+
+    bind_all = bind
+
+    def pack(self, *args, **kwargs):
+        pass
+
+    def configure(self, *args, **kwargs):
+        pass
+
+
+class NullRoot:
+    """Stands in for a tk root window of a given size. Never schedules."""
+    def __init__(self, width=1600, height=900):
+        self.width = width
+        self.height = height
+
+    def winfo_width(self):
+        return self.width
+
+    def winfo_height(self):
+        return self.height
+
+    def after(self, *args):
+        pass
+
+    def after_cancel(self, *args):
+        pass
+
+    def _ignore(self, *args, **kwargs):
+        pass
+
+    title = attributes = update_idletasks = config = _ignore
+    event_generate = mainloop = destroy = _ignore
+
+
+def grid_scene(kind='cube', n=4, spacing=2, instanced=False):
+    """
+    Build an n*n*n grid of shapes centred on the origin.
+    :param kind: str, key of SHAPES, or 'mixed' to cycle through them
+    :param n: int, shapes per side
+    :param spacing: float, distance between neighbouring anchors
+    :param instanced: bool, share one mesh per kind instead of combining copies
+    :return: ShapeCombination, or Instances if instanced
+    """
+    kinds = list(SHAPES.values()) if kind == 'mixed' else [SHAPES[kind]]
+    half = (n-1) * spacing / 2
+    if instanced:
+        group = Instances()
+        for i in range(n):
+            for j in range(n):
+                for k in range(n):
+                    shape = kinds[(i+j+k) % len(kinds)]
+                    group.add(shape, Vector3((i*spacing, j*spacing, k*spacing)))
+        group.move_by(Vector3((-half, -half, -half)))
+        return group
+    shapes = []
+    for i in range(n):
+        for j in range(n):
+            for k in range(n):
+                shape = kinds[(i+j+k) % len(kinds)]
+                shapes.append(shape(Vector3((i*spacing, j*spacing, k*spacing))))
+    return ShapeCombination(*shapes, shift=Vector3((-half, -half, -half)))
+
+
+def orbit_path(frames, radius):
+    """Circle the origin while looking at it."""
+    for f in range(frames):
+        a = 2*pi * f / frames
+        pos = Vector3((radius*sin(a), -radius*cos(a), radius/4))
+        yield pos, -atan2(radius/4, radius), a
+
+
+def fly_path(frames, radius):
+    """Fly straight through the scene along the y axis."""
+    for f in range(frames):
+        y = -radius + 2*radius * f / frames
+        yield Vector3((0.3, y, 0.2)), 0.0, 0.0
+
+
+def static_path(frames, radius):
+    """Stay put, looking at the origin."""
+    for f in range(frames):
+        yield Vector3((0.0, -radius, 0.0)), 0.0, 0.0
+
+
+PATHS = {
+    'orbit': orbit_path,
+    'fly': fly_path,
+    'static': static_path,
+}
+
+
+def run(scene='cube', n=4, frames=200, warmup=10, path='orbit', size=(1600, 900),
+        raster=False, ppm=None, workers=0, cache_file=None, instanced=False, adaptive=None,
+        replay=None, replay_input=False):
+    """
+    Benchmark Spinny.draw on a generated scene and camera path.
+    :param raster: bool, use the software rasteriser instead of polygons
+    :param ppm: str, directory to write rasterised frames to as PPM files
+    :param workers: int, rasterise in parallel on this many processes
+    :param cache_file: str, load the scene from this cache (saved if missing)
+    :param instanced: bool, draw the grid as instances of shared meshes (no cache)
+    :param adaptive: float, let the quality governor aim for this frame rate
+    :param replay: str, take the camera path from this recording (frames is then
+        whatever it has left after warmup)
+    :param replay_input: bool, re-run the recording's input instead of following its poses
+    :return: (dict report, Spinny app)
+    """
+    t = time.perf_counter()
+    if instanced:
+        shape = grid_scene(scene, n, instanced=True)
+    else:
+        shape = cache.cached(
+            cache_file,
+            cache.source_key(__file__, 'grid', scene, n),  # grid_scene lives here
+            lambda: grid_scene(scene, n),
+        )
+    build = time.perf_counter() - t
+
+    canvas = NullCanvas()
+    app = Spinny(
+        NullRoot(*size), shape, canvas=canvas, raster=raster, raster_workers=workers,
+        target_fps=adaptive or 30, adaptive=adaptive is not None,
+    )
+    frame_no = iter(range(warmup + frames))
+    if ppm is None:
+        app.present = lambda fb: None
+    else:
+        os.makedirs(ppm, exist_ok=True)
+        app.present = lambda fb: fb.save_ppm(
+            os.path.join(ppm, 'frame{:05d}.ppm'.format(next(frame_no)))
+        )
+    radius = n * 2 + 6
+    if replay is None:
+        poses = list(PATHS[path](warmup + frames, radius))
+    else:
+        path = replay
+        recorded = len(app.replay(replay, exact=not replay_input).records)
+        frames = recorded - warmup
+        if frames < 1:
+            raise ValueError('{} has {} frames, not enough for {} warmup frames'.format(replay, recorded, warmup))
+        poses = [None] * recorded  # the replay moves the camera
+
+    times = []
+    quality = Counter()  # governor level -> frames
+    for f, pose in enumerate(poses):
+        if f == warmup:
+            canvas.calls.clear()
+            app.timer = FrameTimer(size=frames)
+        if pose is not None:
+            app.camera.pos, app.camera.x_angle, app.camera.z_angle = pose
+            app.camera.set_angle_update()
+
+        t = time.perf_counter()
+        app.draw()
+        if f >= warmup:
+            times.append((time.perf_counter() - t) * 1000)
+            if app.governor is not None:
+                quality[app.governor.level] += 1
+
+    total = sum(times) / 1000
+    counts = shape if instanced else shape.mesh  # instances count every copy
+    return {
+        'scene': scene,
+        'n': n,
+        'path': path,
+        'frames': frames,
+        'backend': 'numpy' if backend.NUMPY else 'python',
+        'renderer': 'raster' if raster else 'polygons',
+        'workers': workers if raster else None,
+        'python': sys.version.split()[0],
+        'instanced': instanced,
+        'vertices': counts.vertex_count,
+        'faces': counts.face_count,
+        'build_s': build,
+        'frame_ms': percentiles(times),
+        'stage_ms': {
+            stage: percentiles(list(values))
+            for stage, values in app.timer.history.items() if stage != 'total'
+        },
+        'fps': frames / total if total else None,
+        'faces_per_s': counts.face_count * frames / total if total else None,
+        'quality_levels': dict(sorted(quality.items())) if adaptive else None,
+        'canvas_calls_per_frame': {k: v / frames for k, v in sorted(canvas.calls.items())},
+    }, app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m spinny.bench', description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scene', choices=[*SHAPES, 'mixed'], default='cube')
+    parser.add_argument('--n', type=int, default=4, help='shapes per side of the grid')
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--path', choices=PATHS, default='orbit')
+    parser.add_argument('--size', type=int, nargs=2, default=(1600, 900), metavar=('W', 'H'))
+    parser.add_argument('--python', action='store_true', help="don't use NumPy even if installed")
+    parser.add_argument('--timings', metavar='FILE', help='also write per-frame stage times as JSON lines')
+    parser.add_argument('--raster', action='store_true', help='use the software rasteriser')
+    parser.add_argument('--ppm', metavar='DIR', help='write rasterised frames to DIR (implies --raster)')
+    parser.add_argument('--workers', type=int, default=0, help='rasterise tiles on this many processes')
+    parser.add_argument('--cache', metavar='FILE', help='load the scene from FILE, building and saving it if needed')
+    parser.add_argument('--instances', action='store_true', help='build the grid from instances of shared meshes')
+    parser.add_argument('--adaptive', type=float, metavar='FPS', help='let the quality governor aim for FPS')
+    parser.add_argument('--replay', metavar='FILE', help='take the camera path from a recording (see --record)')
+    parser.add_argument('--replay-input', action='store_true',
+                        help="with --replay, re-run the recorded input instead of following its poses")
+    args = parser.parse_args(argv)
+
+    if args.python:
+        backend.NUMPY = False
+    report, app = run(
+        args.scene, args.n, args.frames, args.warmup, args.path, tuple(args.size),
+        raster=args.raster or args.ppm is not None,
+        ppm=args.ppm,
+        workers=args.workers,
+        cache_file=args.cache,
+        instanced=args.instances,
+        adaptive=args.adaptive,
+        replay=args.replay,
+        replay_input=args.replay_input,
+    )
+    if args.timings:
+        with open(args.timings, 'w') as fp:
+            app.timer.export(fp)
+    if app.tiles is not None:
+        app.tiles.close()
+    json.dump(report, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+from array import array
+from math import sqrt
+
+from spinny import backend
+
+
+class BVH:
+    """
+    Bounding volume hierarchy over the faces of a Mesh.
+
+    Every node has a bounding sphere and owns a contiguous run of `order`,
+    so a node that is completely inside (or outside) the view frustum is
+    accepted (or rejected) in one go. Nodes are stored depth first: the
+    left child of node n is n+1, the right child is right[n].
+
+    query(self, planes) returns faces that may be in view.
+    move_by(self, pos) moves the hierarchy along with its mesh.
+    transform(self, m) transforms the hierarchy along with its mesh.
+    refit(self) recomputes every bound from the mesh.
+
+    mesh: Mesh the hierarchy was built for.
+    order: array('i'), face indices grouped by node.
+    centres: array('d'), x, y, z of each node's sphere centre.
+    radii: array('d'), radius of each node's sphere.
+    start, count: array('i'), each node's run of order.
+    right: array('i'), right child of each node, -1 for leaves.
+    """
+    __slots__ = ('mesh', 'order', 'centres', 'radii', 'start', 'count', 'right')
+
+    LEAF_SIZE = 8
+
+    def __init__(self, mesh):
+        self.mesh = mesh
+        self.order = array('i', range(mesh.face_count))
+        self.centres = array('d')
+        self.radii = array('d')
+        self.start = array('i')
+        self.count = array('i')
+        self.right = array('i')
+
+        if mesh.face_count:
+            self._split(0, mesh.face_count)
+            self.refit()
+
+    @property
+    def node_count(self):
+        return len(self.radii)
+
+    def _split(self, start, count):
+        """Add node for order[start:start+count], then its children."""
+        n = self.node_count
+        self.centres.extend((0.0, 0.0, 0.0))  # filled in by refit
+        self.radii.append(0.0)
+        self.start.append(start)
+        self.count.append(count)
+        self.right.append(-1)
+        if count <= self.LEAF_SIZE:
+            return
+
+        centres = self.mesh.centres
+        faces = self.order[start:start+count]
+        spans = [  # split along the axis the face centres spread out most
+            max(centres[3*f+i] for f in faces) - min(centres[3*f+i] for f in faces)
+            for i in range(3)
+        ]
+        axis = spans.index(max(spans))
+        self.order[start:start+count] = array(
+            'i', sorted(faces, key=lambda f: centres[3*f+axis]),
+        )
+        half = count // 2
+        self._split(start, half)
+        self.right[n] = self.node_count
+        self._split(start+half, count-half)
+
+    def refit(self):
+        """Recompute every bounding sphere from the mesh vertices."""
+        mesh = self.mesh
+        coords = mesh.coords
+        index = mesh.index
+        offsets = mesh.offsets
+        inf = float('inf')
+        boxes = [None] * self.node_count
+        for n in reversed(range(self.node_count)):  # children before parents
+            r = self.right[n]
+            if r < 0:
+                lo = [inf, inf, inf]
+                hi = [-inf, -inf, -inf]
+                for f in self.order[self.start[n]:self.start[n]+self.count[n]]:
+                    for p in index[offsets[f]:offsets[f+1]]:
+                        for i in range(3):
+                            x = coords[3*p+i]
+                            if x < lo[i]:
+                                lo[i] = x
+                            if x > hi[i]:
+                                hi[i] = x
+            else:
+                (lo_l, hi_l), (lo_r, hi_r) = boxes[n+1], boxes[r]
+                lo = list(map(min, lo_l, lo_r))
+                hi = list(map(max, hi_l, hi_r))
+            boxes[n] = (lo, hi)
+            # sphere around the box, loose but cheap and rotation proof
+            self.centres[3*n:3*n+3] = array('d', ((a+b) / 2 for a, b in zip(lo, hi)))
+            self.radii[n] = sqrt(sum((b-a)**2 for a, b in zip(lo, hi))) / 2
+
+    def move_by(self, pos):
+        """
+        Move every bound by an offset.
+        :param pos: Vector
+        """
+        backend.move_by(self.centres, pos)
+
+    def transform(self, m):
+        """
+        Follow a matrix transformation of the mesh, after the mesh has had it.
+
+        Rotations (and moves, for an affine Matrix4) only move the sphere
+        centres, anything else refits from the mesh.
+        :param m: Matrix3, or an affine Matrix4
+        """
+        if _is_rotation(m.linear if m.size == (4, 4) else m):
+            backend.transform(self.centres, m)
+        else:
+            self.refit()
+
+    def query(self, planes):
+        """
+        Find faces whose node sphere touches the view frustum.
+        :param planes: list of (x, y, z, d) planes with unit normals pointing
+            in, see camera.Projector.planes
+        :return: sorted list of face indices
+        """
+        if not self.node_count:
+            return []
+        centres = self.centres
+        radii = self.radii
+        order = self.order
+        res = []
+        stack = [0]
+        while stack:
+            n = stack.pop()
+            x, y, z = centres[3*n], centres[3*n+1], centres[3*n+2]
+            r = radii[n]
+            inside = True
+            for a, b, c, d in planes:
+                dist = a*x + b*y + c*z + d
+                if dist < -r:
+                    break  # completely outside this plane
+                if dist < r:
+                    inside = False  # cut by this plane
+            else:
+                if inside or self.right[n] < 0:  # all inside, or a leaf
+                    s = self.start[n]
+                    res.extend(order[s:s+self.count[n]])
+                else:
+                    stack.append(self.right[n])
+                    stack.append(n+1)
+        res.sort()
+        return res
+
+
+def _is_rotation(m, eps=1e-9):
+    """Check whether a 3x3 matrix is orthogonal (lengths preserved)."""
+    rows = m._value
+    for i, a in enumerate(rows):
+        for j, b in enumerate(rows):
+            dot = a[0]*b[0] + a[1]*b[1] + a[2]*b[2]
+            if abs(dot - (i == j)) > eps:
+                return False
+    return True
@@ -0,0 +1,141 @@
+"""
+Binary scene cache, so processed shapes don't have to be rebuilt.
+
+A cache file is a fixed header followed by the Mesh arrays, exactly as
+they are in memory:
+
+    header: magic, format version, byte order, array lengths, source key
+    coords, normals, centres (doubles)
+    index, offsets, colour_ids (ints)
+    palette (3 bytes per colour)
+
+The source key is a hash of whatever the mesh was built from (see
+source_key). A file with a different key, format version or byte order
+is ignored and rebuilt, so a changed model or changed code never loads
+stale geometry.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from spinny.colour import Colour
+from spinny.mesh import Mesh
+from spinny.shapes import Shape
+
+
+MAGIC = b'SPNY'
+VERSION = 1
+ORDER = sys.byteorder[0].encode()  # b'l' or b'b'
+# magic, version, byte order, vertices, index length, faces, colours, key
+HEADER = struct.Struct('<4sHc1xIIII20s4x')
+
+DOUBLES = ('coords', 'normals', 'centres')
+INTS = ('index', 'offsets', 'colour_ids')
+# modules whose code decides what a built mesh looks like, part of every key
+BUILDERS = tuple(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+    for name in ('backend.py', 'colour.py', 'common.py', 'loader.py', 'matrix.py', 'mesh.py', 'shapes.py')
+)
+
+
+def source_key(*sources):
+    """
+    Hash the things a mesh is built from, plus the mesh building modules
+    (BUILDERS), so editing any of them invalidates every cache.
+    Existing file paths count with their size and modification time,
+    anything else by its repr.
+    :return: bytes, 20 long
+    """
+    h = hashlib.sha1()
+    for source in (*sources, *BUILDERS):
+        if isinstance(source, str) and os.path.isfile(source):
+            st = os.stat(source)
+            source = (os.path.abspath(source), st.st_size, st.st_mtime_ns)
+        h.update(repr(source).encode())
+        h.update(b'\0')
+    return h.digest()
+
+
+def save(path, mesh, key):
+    """
+    Write a Mesh to a cache file. The file is replaced in one go, so
+    readers never see half of it. Materialise a Shape before saving its mesh.
+    :param path: str
+    :param mesh: Mesh
+    :param key: bytes, from source_key
+    """
+    tmp = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp, 'wb') as fp:
+        fp.write(HEADER.pack(
+            MAGIC, VERSION, ORDER,
+            mesh.vertex_count, len(mesh.index), mesh.face_count, len(mesh.palette),
+            key,
+        ))
+        for name in (*DOUBLES, *INTS):
+            fp.write(getattr(mesh, name))
+        fp.write(b''.join(bytes(c.rgb) for c in mesh.palette))
+    os.replace(tmp, path)
+
+
+def load(path, key):
+    """
+    Read a Mesh from a cache file, if it is there and up to date.
+    :param path: str
+    :param key: bytes, from source_key
+    :return: Mesh, or None if the cache can't be used
+    """
+    try:
+        fp = open(path, 'rb')
+    except OSError:
+        return None
+    with fp:
+        size = os.fstat(fp.fileno()).st_size
+        if size < HEADER.size:
+            return None
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, version, order, vertices, indices, faces, colours, stored = HEADER.unpack_from(mm)
+            if (magic, version, order, stored) != (MAGIC, VERSION, ORDER, key):
+                return None
+            lengths = {
+                'coords': 3*vertices, 'normals': 3*faces, 'centres': 3*faces,
+                'index': indices, 'offsets': faces+1, 'colour_ids': faces,
+            }
+            mesh = Mesh()
+            pos = HEADER.size
+            with memoryview(mm) as buf:
+                for name in (*DOUBLES, *INTS):
+                    arr = getattr(mesh, name)
+                    del arr[:]
+                    end = pos + lengths[name]*arr.itemsize
+                    if end > size:
+                        return None
+                    with buf[pos:end] as chunk:
+                        arr.frombytes(chunk)
+                    pos = end
+                if pos + 3*colours != size:
+                    return None
+                palette = mm[pos:pos + 3*colours]
+    mesh.palette = [Colour(tuple(palette[i:i+3])) for i in range(0, len(palette), 3)]
+    return mesh
+
+
+def cached(path, key, build):
+    """
+    Load a Shape from the cache, or build it and save it for next time.
+    :param path: str, cache file (None to just build)
+    :param key: bytes, from source_key
+    :param build: function returning the Shape
+    :return: Shape
+    """
+    if path is None:
+        return build()
+    mesh = load(path, key)
+    if mesh is not None:
+        return Shape.from_mesh(mesh)
+    shape = build()
+    shape.materialise()  # the cache has no model transform
+    save(path, shape.mesh, key)
+    return shape
@@ -1,27 +1,293 @@
-from math import pi
+from copy import copy
+from itertools import chain
+from math import pi, sqrt
 
-from spinny.matrix import Matrix as M, Vector as V
-from spinny.common import V3, M3
+from spinny.matrix import Vector as V, Vector3, Matrix3, Matrix4
+from spinny.common import V3, M3, M4
+
+
+# frustum outcodes, one bit for each plane a point is outside of
+NEAR, FAR, LEFT, RIGHT, BOTTOM, TOP = 1, 2, 4, 8, 16, 32
+# polygons are only cut at the sides past a guard band GUARD screens wide
+GUARD = 4
+GUARD_LEFT, GUARD_RIGHT, GUARD_BOTTOM, GUARD_TOP = 64, 128, 256, 512
+CLIP = NEAR | GUARD_LEFT | GUARD_RIGHT | GUARD_BOTTOM | GUARD_TOP
 
 
 def projection(v, camera, centre):
     """
     Project 3D vector onto 2D screen.
+
+    Builds a fresh Projector, so prefer Projector.project_all for many points.
     :param v: 3D Vector
     :param camera: Camera object
     :param centre: 2D Vector, centre of screen
     :return: 2D Vector, position on screen
     """
-    v -= camera.pos  # camera is basically the origin after this
-    v = M3.z_rot(-camera.z_angle) @ v  # rotate points on z-axis around camera
-    v = M3.x_rot(-camera.x_angle) @ v  # in the opposite direction
-
-    sx = 1/v._value[1]  # more distance => point closer to middle (?)
-    sy = 1/v._value[1]
-    sx *= 800  # zoom way in (original pyramid is tiny)
-    sy *= -800  # tk has y pointing down
-    res = M(((sx, 0, 0), (0, 0, sy))) @ v  # Apply transform from Q3 to Q2
-    res += centre  # move to the middle
+    return V(Projector(camera, centre).project(v))
+
+
+class Projector:
+    """
+    View-projection transform for one frame, built once from Camera state.
+
+    Folds the camera translation and inverse rotation into a single 3x4
+    affine map so projecting a vertex is a handful of multiply-adds.
+
+    view(self, v) returns camera-space coordinates of a 3D point.
+    project(self, v) returns screen position of a 3D point.
+    project_all(self, points) projects a whole vertex list in one pass.
+    project_buffer(self, coords) does the same for a flat xyz buffer.
+    clip(self, verts, code) projects a polygon cut down to what can be seen.
+    local(self, m, offset) returns a Projector for points in a model's space.
+    matrix(self) returns the whole projection as one homogeneous Matrix4.
+
+    rows: inverse camera rotation as 3 row tuples.
+    offset: rotated camera position (subtracted after rotating).
+    centre: (x, y) tuple, centre of screen.
+    zoom: float, screen scaling.
+    pos: 3-Vector, camera position.
+    forward: 3-Vector, camera direction.
+    near, far: floats, distances of the near and far planes.
+    tangents: (x, z) tan of half the view angle across and up the screen.
+    planes: list of (x, y, z, d) for the six frustum planes in world space,
+        normals are unit length and point in, so p is inside if n.p + d >= 0.
+    """
+    def __init__(self, camera, centre, zoom=800, near=0.05, far=1000.0):
+        """
+        :param camera: Camera object
+        :param centre: 2D Vector, centre of screen
+        :param zoom: float, screen scaling (original pyramid is tiny)
+        :param near: float, closest distance drawn
+        :param far: float, furthest distance drawn
+        """
+        rows = camera.rot_matrix.transpose()._value  # rotations are orthogonal
+        px, py, pz = camera.pos._value
+        self.rows = rows
+        self.offset = tuple(r0*px + r1*py + r2*pz for r0, r1, r2 in rows)
+        self.pos = camera.pos
+        self.forward = camera.view
+        self.centre = centre._value
+        self.zoom = zoom
+        self.near = near
+        self.far = far
+        tx, tz = self.tangents = (self.centre[0] / zoom, self.centre[1] / zoom)
+
+        self.view_planes = {  # camera space, inside if a*x + b*y + c*z + d >= 0
+            NEAR: (0, 1, 0, -near),
+            FAR: (0, -1, 0, far),
+            LEFT: (1, tx, 0, 0),
+            RIGHT: (-1, tx, 0, 0),
+            BOTTOM: (0, tz, 1, 0),
+            TOP: (0, tz, -1, 0),
+            GUARD_LEFT: (1, GUARD*tx, 0, 0),
+            GUARD_RIGHT: (-1, GUARD*tx, 0, 0),
+            GUARD_BOTTOM: (0, GUARD*tz, 1, 0),
+            GUARD_TOP: (0, GUARD*tz, -1, 0),
+        }
+        ox, oy, oz = self.offset
+        self.planes = []
+        for bit in (NEAR, FAR, LEFT, RIGHT, BOTTOM, TOP):
+            a, b, c, d = self.view_planes[bit]
+            n = [a*r0 + b*r1 + c*r2 for r0, r1, r2 in zip(*rows)]  # back to world space
+            length = sqrt(n[0]*n[0] + n[1]*n[1] + n[2]*n[2])
+            self.planes.append((
+                n[0] / length,
+                n[1] / length,
+                n[2] / length,
+                (d - a*ox - b*oy - c*oz) / length,
+            ))
+
+    def view(self, v):
+        """
+        Transform point into camera space (x right, y depth, z up).
+        :param v: 3D Vector
+        :return: tuple of 3 floats
+        """
+        (a0, a1, a2), (b0, b1, b2), (c0, c1, c2) = self.rows
+        ox, oy, oz = self.offset
+        x, y, z = v._value
+        return (
+            a0*x + a1*y + a2*z - ox,
+            b0*x + b1*y + b2*z - oy,
+            c0*x + c1*y + c2*z - oz,
+        )
+
+    def project(self, v):
+        """
+        Project 3D point onto the screen.
+        :param v: 3D Vector
+        :return: (x, y) tuple, position on screen
+        """
+        x, y, z = self.view(v)
+        s = self.zoom / y  # more distance => point closer to middle
+        return (self.centre[0] + s*x, self.centre[1] - s*z)  # tk y points down
+
+    def project_all(self, points):
+        """
+        Project every point in one pass.
+        :param points: iterable of 3D Vectors
+        :return: list of (x, y) tuples, in input order
+        """
+        return self.project_buffer(chain.from_iterable(v._value for v in points))
+
+    def project_buffer(self, coords, depth=False, codes=False):
+        """
+        Project every point of a flat coordinate buffer in one pass.
+
+        Points closer than the near plane can't be projected, they all go
+        to the centre of the screen (with 0 inverse depth). Faces using
+        them have to be clipped, see clip.
+        :param coords: sequence of floats, x, y, z of each point
+        :param depth: bool, also return 1/distance along the view
+        :param codes: bool, also return the frustum outcode of every point
+        :return: list of (x, y) or (x, y, 1/depth) tuples, in input order,
+            and with codes a list of ints (bits of planes the point is outside)
+        """
+        (a0, a1, a2), (b0, b1, b2), (c0, c1, c2) = self.rows
+        ox, oy, oz = self.offset
+        cx, cy = self.centre
+        zoom = self.zoom
+        near = self.near
+        far = self.far
+        tx, tz = self.tangents
+        res = []
+        append = res.append
+        outcodes = []
+        it = iter(coords)
+        for x, y, z in zip(it, it, it):
+            vx = a0*x + a1*y + a2*z - ox
+            vy = b0*x + b1*y + b2*z - oy
+            vz = c0*x + c1*y + c2*z - oz
+            if vy > near:
+                inv = 1 / vy
+                s = zoom * inv
+                p = (cx + s*vx, cy - s*vz)
+            else:
+                inv = 0.0
+                p = (cx, cy)
+            append(p + (inv,) if depth else p)
+            if codes:
+                c = NEAR if vy <= near else FAR if vy > far else 0  # exactly the points not projected
+                hx = tx*vy
+                hz = tz*vy
+                if vx < -hx:  # behind the camera a point can be left and right
+                    c |= LEFT if vx >= -GUARD*hx else LEFT | GUARD_LEFT
+                if vx > hx:
+                    c |= RIGHT if vx <= GUARD*hx else RIGHT | GUARD_RIGHT
+                if vz < -hz:
+                    c |= BOTTOM if vz >= -GUARD*hz else BOTTOM | GUARD_BOTTOM
+                if vz > hz:
+                    c |= TOP if vz <= GUARD*hz else TOP | GUARD_TOP
+                outcodes.append(c)
+        return (res, outcodes) if codes else res
+
+    def clip(self, verts, code, depth=False):
+        """
+        Cut a polygon down to the near plane and guard band, then project it.
+        :param verts: list of (x, y, z) world coordinates
+        :param code: int, planes to clip against (OR of the corner outcodes)
+        :param depth: bool, also return 1/distance along the view
+        :return: list of (x, y) or (x, y, 1/depth), empty if nothing is left
+        """
+        (a0, a1, a2), (b0, b1, b2), (c0, c1, c2) = self.rows
+        ox, oy, oz = self.offset
+        poly = [
+            (
+                a0*x + a1*y + a2*z - ox,
+                b0*x + b1*y + b2*z - oy,
+                c0*x + c1*y + c2*z - oz,
+            )
+            for x, y, z in verts
+        ]
+        if code & NEAR:
+            code |= CLIP  # new corners on the near plane can be anywhere
+        for bit, plane in self.view_planes.items():
+            if code & bit & CLIP:
+                poly = _clip_polygon(poly, plane)
+                if len(poly) < 3:
+                    return []
+
+        cx, cy = self.centre
+        zoom = self.zoom
+        res = []
+        for x, y, z in poly:
+            inv = 1 / y
+            s = zoom * inv
+            p = (cx + s*x, cy - s*z)
+            res.append(p + (inv,) if depth else p)
+        return res
+
+    @property
+    def matrix(self):
+        """
+        View and perspective in one 4x4 matrix, taking a point to screen
+        x, y and a depth from 0 (near plane) to 1 (far plane).
+        Unlike project, points behind the camera aren't caught.
+        :return: Matrix4
+        """
+        rows = self.rows
+        ox, oy, oz = self.offset
+        view = Matrix4((
+            (*rows[0], -ox),
+            (*rows[1], -oy),
+            (*rows[2], -oz),
+            (0, 0, 0, 1),
+        ))
+        return M4.perspective(self.centre, self.zoom, self.near, self.far) @ view
+
+    def local(self, m, offset):
+        """
+        Projector for points in a model's own space, the model transform
+        (world = m @ p + offset) is folded into the camera transform.
+
+        Everything is in model space: pos, forward (transposed, so dot
+        products with face directions keep their sign) and planes.
+        :param m: Matrix3, invertible
+        :param offset: 3-Vector
+        :return: Projector
+        """
+        res = copy(self)
+        rows = Matrix3(self.rows)
+        res.rows = (rows @ m)._value
+        t = (rows @ offset)._value
+        res.offset = tuple(o - x for o, x in zip(self.offset, t))
+        res.pos = m.inverse @ (self.pos - offset)
+        res.forward = m.transpose() @ self.forward
+        mt = m._value
+        ox, oy, oz = offset._value
+        res.planes = []
+        for a, b, c, d in self.planes:
+            n = [a*r0 + b*r1 + c*r2 for r0, r1, r2 in zip(*mt)]  # m transposed @ normal
+            length = sqrt(n[0]*n[0] + n[1]*n[1] + n[2]*n[2])
+            res.planes.append((
+                n[0] / length,
+                n[1] / length,
+                n[2] / length,
+                (a*ox + b*oy + c*oz + d) / length,
+            ))
+        return res
+
+
+def _clip_polygon(poly, plane):
+    """
+    Sutherland-Hodgman, keep the part of a polygon inside one plane.
+    :param poly: list of (x, y, z)
+    :param plane: (a, b, c, d), inside where a*x + b*y + c*z + d >= 0
+    :return: list of (x, y, z)
+    """
+    a, b, c, d = plane
+    res = []
+    prev = poly[-1]
+    prev_d = a*prev[0] + b*prev[1] + c*prev[2] + d
+    for cur in poly:
+        cur_d = a*cur[0] + b*cur[1] + c*cur[2] + d
+        if (cur_d >= 0) != (prev_d >= 0):  # edge crosses the plane
+            t = prev_d / (prev_d - cur_d)
+            res.append(tuple(p + (q-p)*t for p, q in zip(prev, cur)))
+        if cur_d >= 0:
+            res.append(cur)
+        prev, prev_d = cur, cur_d
     return res
 
 
@@ -33,7 +299,7 @@ class Camera:
 
     rot_matrix(self) returns viewing direction as a rotation matrix.
     view(self) returns viewing direction as normalised vector.
-    move(self, v) moves camera position relative viewing direction.
+    move(self, v, scale) moves camera position relative viewing direction.
     turn(self, rad_x, rad_z) turns camera on x and z axes.
 
     pos: 3-Vector with position.
@@ -44,7 +310,7 @@ class Camera:
     """
     def __init__(
         self,
-        pos=V((0.0, -10.0, 0.0)),
+        pos=Vector3((0.0, -10.0, 0.0)),
         angles=(0.0, 0.0),
         speed=0.1,
         rot_speed=pi/64,
@@ -78,17 +344,18 @@ class Camera:
             self.view_outdated = False
         return self._view
 
-    def move(self, v):
+    def move(self, v, scale=1):
         """
         Move camera position by a vector.
 
         Acts relative to camera direction.
         :param v: Vector
+        :param scale: float, number of steps to take (e.g. time held * rate)
         """
-        z = v.project((V3.k,))
-        xy = v - z  # should be done in matrix but this is faster
-        delta = (self.rot_matrix @ xy) + z  # up/down independent of view direction
-        self.pos += self.speed * delta
+        x, y, z = v._value
+        dx, dy, dz = (self.rot_matrix @ Vector3((x, y, 0)))._value  # up/down independent of view direction
+        s = self.speed * scale
+        self.pos += Vector3((s*dx, s*dy, s*(dz + z)))
 
     def turn(self, rad_x, rad_z):
         """
@@ -113,3 +380,4 @@ class Camera:
         self.view_outdated = True
         self.rot_matrix_outdated = True
 
+
@@ -1,5 +1,7 @@
 from math import e, exp
 
+from spinny import backend
+
 # TODO extract into misc module
 class Colour:  # TODO should this subclass Vector? + and * would be useful
     COMMON_COLOURS = {
@@ -104,3 +106,86 @@ class Shader:
     def _logistic(x):
         return 0.5 + 0.5/(1+exp(-4*x))
 
+
+class ShadeCache:
+    """
+    Caches face fill strings so shading is not redone every triangle.
+
+    Each base colour gets a table of hex strings for evenly spaced shade
+    ratings in [-1, 1], shared by every face with that colour. Face fills
+    are looked up in those tables and remembered until the mesh turns
+    (Mesh.version changes) or the sun moves.
+
+    table(self, colour) returns the memoised hex strings of a colour.
+    face_fills(self, mesh, faces) returns the fill of each given face.
+
+    shader: Shader used to fill the tables.
+    sun: Vector, direction of light. Setting it clears the face fills.
+    levels: int, shade levels per colour, at least 2. Setting it clears everything.
+    """
+    def __init__(self, shader, sun, levels=256):
+        self.shader = shader
+        self.levels = levels
+        self.sun = sun
+
+    @property
+    def levels(self):
+        return self._levels
+
+    @levels.setter
+    def levels(self, n):
+        if n < 2:  # need a darkest and a brightest shade to spread between
+            raise ValueError('ShadeCache needs at least 2 levels, got {}'.format(n))
+        self._levels = n
+        self._tables = {}
+        self._mesh = None
+
+    @property
+    def sun(self):
+        return self._sun
+
+    @sun.setter
+    def sun(self, v):
+        self._sun = v
+        self._mesh = None  # lighting changed, every face is outdated
+
+    def table(self, colour):
+        """
+        Return (and memoise) hex strings of a colour at every shade level.
+        :param colour: Colour
+        :return: list of str, darkest rating first
+        """
+        res = self._tables.get(colour.rgb)
+        if res is None:
+            step = 2 / (self.levels-1)
+            res = self._tables[colour.rgb] = [
+                colour.adjust_value(self.shader.shade(i*step - 1)).hx
+                for i in range(self.levels)
+            ]
+        return res
+
+    def face_fills(self, mesh, faces):
+        """
+        Return fill strings for faces, shading only the ones not cached.
+        :param mesh: Mesh
+        :param faces: list of face indices
+        :return: list of str
+        """
+        if mesh is not self._mesh or mesh.version != self._version:
+            self._mesh = mesh
+            self._version = mesh.version
+            self._fills = [None] * mesh.face_count
+        fills = self._fills
+        missing = [f for f in faces if fills[f] is None]
+        if missing:
+            top = self.levels - 1
+            half = top / 2
+            ratings = backend.shade_ratings(mesh, missing, self._sun)
+            for f, rating in zip(missing, ratings):
+                level = int((rating+1) * half + 0.5)
+                if level < 0:  # face directions aren't always unit length
+                    level = 0
+                elif level > top:
+                    level = top
+                fills[f] = self.table(mesh.face_colour(f))[level]
+        return [fills[f] for f in faces]
@@ -1,12 +1,12 @@
 from math import cos, sin, sqrt
 
-from spinny.matrix import Matrix as M, Vector as V
+from spinny.matrix import Matrix as M, Vector2, Vector3, Matrix3, Matrix4
 
 
 class V2:
-    z = V((0,0))
-    i, j = V((1,0)), V((0,1))
-    e = V((1,1))
+    z = Vector2((0,0))
+    i, j = Vector2((1,0)), Vector2((0,1))
+    e = Vector2((1,1))
 
     z._length = 0
     i._length = j._length = i._length = 1
@@ -14,10 +14,10 @@ class V2:
 
 
 class V3:
-    z = V((0,0,0))
-    i, j, k = V((1,0,0)), V((0,1,0)), V((0,0,1))
-    ij, ik, jk = V((1,1,0)), V((1,0,1)), V((0,1,1))
-    e = V((1,1,1))
+    z = Vector3((0,0,0))
+    i, j, k = Vector3((1,0,0)), Vector3((0,1,0)), Vector3((0,0,1))
+    ij, ik, jk = Vector3((1,1,0)), Vector3((1,0,1)), Vector3((0,1,1))
+    e = Vector3((1,1,1))
 
     z._length = 0
     j._length = k._length = 1
@@ -47,15 +47,15 @@ class M2:
 
 
 class M3:
-    z = M(((0,0,0), (0,0,0), (0,0,0)))
+    z = Matrix3(((0,0,0), (0,0,0), (0,0,0)))
     z._det = 0
 
-    e = M(((1,0,0), (0,1,0), (0,0,1)))
+    e = Matrix3(((1,0,0), (0,1,0), (0,0,1)))
     e._det = 1
 
     @staticmethod
     def x_rot(a):  # right hand rule rotation!
-        m = M((
+        m = Matrix3((
             (1, 0, 0),
             (0, cos(a), -sin(a)),
             (0, sin(a), cos(a)),
@@ -65,9 +65,9 @@ class M3:
 
     @staticmethod
     def y_rot(a):
-        if a == 1:
+        if a == 0:
             return M3.e
-        m = M((
+        m = Matrix3((
             (cos(a), 0, -sin(a)),
             (0, 1, 0),
             (sin(a), 0, cos(a)),
@@ -77,9 +77,9 @@ class M3:
 
     @staticmethod
     def z_rot(a):
-        if a == 1:
+        if a == 0:
             return M3.e
-        m = M((
+        m = Matrix3((
             (cos(a), -sin(a), 0),
             (sin(a), cos(a), 0),
             (0, 0, 1),
@@ -93,7 +93,7 @@ class M3:
             return M3.z
         if s == 1:
             return M3.e
-        m = M((
+        m = Matrix3((
             (s, 0, 0),
             (0, s, 0),
             (0, 0, s),
@@ -101,3 +101,44 @@ class M3:
         m._det = s**3
         return m
 
+
+
+class M4:  # homogeneous transforms of 3D points
+    e = Matrix4(((1,0,0,0), (0,1,0,0), (0,0,1,0), (0,0,0,1)))
+    e._det = 1
+
+    @staticmethod
+    def shift(v):
+        if v is V3.z:
+            return M4.e
+        return Matrix4.affine(M3.e, v)
+
+    @staticmethod
+    def rot(m):  # any 3x3 transform really
+        if m is M3.e:
+            return M4.e
+        return Matrix4.affine(m, V3.z)
+
+    @staticmethod
+    def grow(s):
+        return M4.rot(M3.grow(s))
+
+    @staticmethod
+    def perspective(centre, zoom, near, far):
+        """
+        Camera space (looking along y, z up) to screen x, y and a depth
+        going from 0 at the near plane to 1 at the far plane.
+        :param centre: (x, y), centre of screen
+        :param zoom: float, screen scaling
+        :param near: float, near plane distance
+        :param far: float, far plane distance
+        :return: Matrix4
+        """
+        cx, cy = centre
+        depth = far / (far - near)
+        return Matrix4((
+            (zoom, cx, 0, 0),
+            (0, cy, -zoom, 0),  # tk has y pointing down
+            (0, depth, 0, -near*depth),
+            (0, 1, 0, 0),
+        ))
@@ -0,0 +1,79 @@
+"""
+Keyboard and mouse input, collected between frames and applied once per frame.
+"""
+from math import pi
+from time import perf_counter
+
+
+class Controls:
+    """
+    Collects input between frames and moves a Camera once per frame.
+
+    Key events only change which keys are held and mouse events only add
+    up their movement, so nothing is scheduled on tk per key. Movement is
+    scaled by the time since the last frame, the camera covers the same
+    distance per second whatever the frame rate.
+
+    press(self, key) and release(self, key) record key state.
+    look(self, dx, dy) adds mouse movement in pixels.
+    apply(self, camera, now) moves and turns the camera for this frame.
+    clear(self) forgets held keys and mouse movement (e.g. when pausing).
+
+    bindings: dict of key name -> 3-Vector direction relative to the view.
+    held: set of key names held down.
+    rate: float, Camera.move steps per second while a key is held.
+    sensitivity: float, radians per pixel of mouse movement.
+    max_step: float, longest time (s) one frame may account for.
+    mouse: [dx, dy], pixels moved since the last frame.
+    recorder: recording.Recorder told about every frame's input, or None.
+    """
+    def __init__(self, bindings, rate=100, sensitivity=pi/1000, max_step=0.1):
+        self.bindings = bindings
+        self.held = set()
+        self.rate = rate  # the old key repeat went every 10ms
+        self.sensitivity = sensitivity
+        self.max_step = max_step
+        self.mouse = [0, 0]
+        self.recorder = None
+        self._last = None  # time of the last apply
+
+    def press(self, key):
+        if key in self.bindings:
+            self.held.add(key)
+
+    def release(self, key):
+        self.held.discard(key)
+
+    def look(self, dx, dy):
+        self.mouse[0] += dx
+        self.mouse[1] += dy
+
+    def clear(self):
+        self.held.clear()
+        self.mouse = [0, 0]
+        self._last = None
+
+    def apply(self, camera, now=None):
+        """
+        Move and turn camera by everything since the last call.
+        :param camera: Camera
+        :param now: float, time in seconds (default perf_counter())
+        :return: bool, whether the mouse moved (it wants re-centring)
+        """
+        if now is None:
+            now = perf_counter()
+        dt = 0 if self._last is None else min(now - self._last, self.max_step)
+        self._last = now
+
+        if self.held and dt:
+            direction = sum(self.bindings[key] for key in self.held)  # opposite keys cancel
+            camera.move(direction, scale=dt * self.rate)
+
+        mx, my = self.mouse
+        self.mouse = [0, 0]
+        if mx or my:
+            s = self.sensitivity
+            camera.turn(-my * s, -mx * s)  # mx < 0  <=>  delta θz > 0
+        if self.recorder is not None:
+            self.recorder.record(dt, self.held, mx, my, camera)
+        return bool(mx or my)
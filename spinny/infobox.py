@@ -1,4 +1,5 @@
 from collections import OrderedDict
+from time import perf_counter
 
 
 class InfoBox:
@@ -6,20 +7,28 @@ class InfoBox:
     Draws box with runtime for debug information.
 
     add(self, item, default='', rounding=None) adds item to box.
-    draw(self, *args) re-draws box with updated information.
+    add_graph(self, height, scale, colour) adds rolling graph under the items.
+    draw(self, *args, graph=None) re-draws box with updated information.
 
     canvas: Given tk Canvas object.
     x, y: ints, top-left position of box.
     width: int, with of box in pixels.
     items: OrderedDict of given info lines.
+    interval: float, min seconds between redraws (None redraws every call).
+    graph: canvas line item of the graph, None if there isn't one.
     """
-    def __init__(self, canvas, pos, width, fill='white', border='black'):
+    def __init__(self, canvas, pos, width, fill='white', border='black', interval=None):
         self.canvas = canvas
         self.x, self.y = pos
         self.width = width
+        self.interval = interval
+        self.last_draw = None
 
         self.items = OrderedDict()
         self.counter = 0
+        self.graph = None
+        self.graph_height = 0
+        self.graph_scale = 1
 
         self.text_box = self.canvas.create_polygon(
             0, 0,
@@ -49,13 +58,41 @@ class InfoBox:
         self.counter += 1
         self.resize_box()
 
-    def draw(self, *args):
+    def add_graph(self, height=40, scale=50, colour='red'):
+        """
+        Add a rolling line graph below the items.
+        :param height: int, height in pixels
+        :param scale: float, value at the top of the graph
+        :param colour: str, line colour
+        """
+        if self.graph is not None:
+            return
+        self.graph = self.canvas.create_line(
+            0, 0, 0, 0,
+            fill=colour,
+            tag='infobox',
+        )
+        self.graph_height = height
+        self.graph_scale = scale
+        self.resize_box()
+
+    def draw(self, *args, graph=None):
         """
         Draws/Updates InfoBox with given args.
+
+        Does nothing if the last redraw was less than self.interval ago.
         :param args: iterable of arguments for each item, in order
+        :param graph: sequence of numbers for the graph, oldest first
+        :return: bool, whether the box was redrawn
         """
         if len(args) != len(self.items):
             raise TypeError('Too many/few arguments')
+        now = perf_counter()
+        if self.interval is not None and self.last_draw is not None:
+            if now - self.last_draw < self.interval:
+                return False
+        self.last_draw = now
+
         self.canvas.tag_raise(self.text_box)
         for item, value in zip(self.items, args):
             default, obj, rounding = self.items[item]
@@ -63,12 +100,35 @@ class InfoBox:
                 value = round(value, rounding)
             self.canvas.itemconfig(obj, text=default.format(value))
             self.canvas.tag_raise(obj)
+        if self.graph is not None and graph:
+            self.draw_graph(graph)
+        return True
+
+    def draw_graph(self, values):
+        """
+        Redraw graph line through values, newest on the right.
+        :param values: sequence of numbers
+        """
+        top = self.y + 17*self.counter + 4
+        bottom = top + self.graph_height
+        left = self.x + 2
+        step = (self.width - 4) / max(len(values) - 1, 1)
+        points = []
+        for i, v in enumerate(values):
+            v = min(v / self.graph_scale, 1)  # clip spikes to the top
+            points.append(left + i*step)
+            points.append(bottom - v*self.graph_height)
+        if len(points) == 2:  # tk lines need two points
+            points *= 2
+        self.canvas.coords(self.graph, *points)
+        self.canvas.tag_raise(self.graph)
 
     def resize_box(self):
+        bottom = self.y + 17*self.counter + 4 + self.graph_height  # TODO: fix magic numbers
         self.canvas.coords(
             self.text_box,
             self.x, self.y,
-            self.x, self.y + 17*self.counter + 4,  # TODO: fix magic numbers
-            self.x+self.width, self.y + 17*self.counter + 4,
+            self.x, bottom,
+            self.x+self.width, bottom,
             self.x+self.width, self.y
         )
\ No newline at end of file
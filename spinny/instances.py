@@ -0,0 +1,251 @@
+"""
+Instancing, for scenes that repeat a few shapes many times.
+
+A Shape class builds its Mesh once (Shape.shared_mesh) and every copy of
+it is an Instance: a model transform and maybe a colour, no geometry.
+Each frame the instances in view are expanded into one Mesh, which is
+then drawn like any other. Memory and building time go with the number
+of different meshes, not with the number of copies.
+"""
+from array import array
+from collections import OrderedDict
+from math import sqrt
+
+from spinny import backend
+from spinny.colour import Colour
+from spinny.common import V3, M3
+from spinny.matrix import Vector3
+from spinny.mesh import Mesh
+
+
+class Instance:
+    """
+    One copy of a shared Mesh, placed by its own model transform
+    (a vertex p of the mesh is at model @ p + offset).
+
+    move_by(self, pos) moves the instance by a vector.
+    transform(self, m) allows matrix transformation of the instance.
+
+    mesh: Mesh, shared with other instances. Never changed.
+    model: Matrix3, linear part of the model transform.
+    offset: Vector3, translation part of the model transform.
+    colour: Colour of every face, or None to keep the mesh's colours.
+    group: Instances it belongs to, told about every change.
+    """
+    __slots__ = ('mesh', 'model', 'offset', 'colour', 'group')
+
+    def __init__(self, mesh, model=M3.e, offset=V3.z, colour=None, group=None):
+        self.mesh = mesh
+        self.model = model
+        self.offset = offset
+        self.colour = colour
+        self.group = group
+
+    def move_by(self, pos):
+        """
+        Move Instance by an offset.
+        :param pos: Vector
+        """
+        self.offset = self.offset + pos
+        if self.group is not None:
+            self.group.version += 1
+
+    def transform(self, m):
+        """
+        Preform linear matrix transformation on the instance.
+        :param m: Matrix3
+        """
+        self.model = m @ self.model
+        self.offset = m @ self.offset
+        if self.group is not None:
+            self.group.version += 1
+
+
+class Instances:
+    """
+    Group of Instances, stands in for a Shape.
+
+    The group has a model transform of its own on top of the instances',
+    so moving and spinning the whole group is as cheap as for a Shape.
+    mesh holds the instances that touched the view frustum last time
+    expand was called, already placed in the group's model space. The
+    meshes of recently seen visible sets are kept, so looking back at
+    something (or a spin coming round again) doesn't rebuild it.
+
+    add(self, shape, shift, trans, colour) adds an instance of a Shape class or Mesh.
+    expand(self, planes) rebuilds mesh from the instances in view.
+    move_by(self, pos) moves the group by a vector.
+    transform(self, m) allows matrix transformation of the group.
+    materialise(self) hands the group's model transform down to every instance.
+
+    instances: list of Instances.
+    version: int, bumped whenever an instance changes.
+    mesh: Mesh, expanded instances in model space (from the last expand).
+    bvh: None, expand has already culled whole instances.
+    model: Matrix3, linear part of the group's model transform.
+    offset: Vector3, translation part of the group's model transform.
+    vertex_count, face_count: ints, totals over every instance.
+    kept: int, most expanded meshes kept at once.
+    """
+    bvh = None
+    kept = 64  # a whole turn of the demo's spin, which comes back to the same sets
+
+    def __init__(self):
+        self.instances = []
+        self.version = 0
+        self.mesh = Mesh()
+        self.model = M3.e
+        self.offset = V3.z
+        self._bounds = {}  # Mesh -> (centre, radius) in its own space
+        self._spheres = None  # (version, centres, radii) of every instance
+        self._meshes = OrderedDict()  # visible instances -> expanded Mesh, newest last
+        self._meshes_version = 0  # version those were made at
+
+    @property
+    def vertex_count(self):
+        return sum(instance.mesh.vertex_count for instance in self.instances)
+
+    @property
+    def face_count(self):
+        return sum(instance.mesh.face_count for instance in self.instances)
+
+    def add(self, shape, shift=V3.z, trans=M3.e, colour=None):
+        """
+        Add an instance, placed the same way Shape(shift, trans) would be.
+        :param shape: Shape subclass (uses its shared mesh) or Mesh
+        :param shift: Vector, where the anchor (first point) goes
+        :param trans: Matrix3, applied after moving
+        :param colour: Colour or colour name for every face (None keeps them)
+        :return: Instance
+        """
+        mesh = shape if isinstance(shape, Mesh) else shape.shared_mesh()
+        if isinstance(colour, str):
+            colour = Colour(colour)
+        offset = shift - mesh.point(0) if mesh.vertex_count else shift
+        instance = Instance(mesh, trans, trans @ offset, colour, self)
+        self.instances.append(instance)
+        self.version += 1
+        return instance
+
+    def move_by(self, pos):
+        """
+        Move the whole group by an offset.
+        :param pos: Vector
+        """
+        self.offset = self.offset + pos
+
+    def transform(self, m):
+        """
+        Preform linear matrix transformation on the whole group.
+        Only composes the group's model transform.
+        :param m: Matrix3
+        """
+        self.model = m @ self.model
+        self.offset = m @ self.offset
+        if m.det == 0:  # model transform has to stay invertible
+            self.materialise()
+
+    def materialise(self):
+        """Apply the group's model transform to every instance, leaving an identity transform."""
+        if self.model is M3.e and self.offset is V3.z:
+            return
+        for instance in self.instances:
+            instance.model = self.model @ instance.model
+            instance.offset = self.model @ instance.offset + self.offset
+        self.version += 1
+        self.model = M3.e
+        self.offset = V3.z
+
+    def expand(self, planes):
+        """
+        Set mesh to the instances whose bounding sphere touches the view
+        frustum, built only if that set hasn't been seen recently.
+        :param planes: list of (x, y, z, d) planes in the group's model space,
+            see camera.Projector.planes
+        :return: Mesh
+        """
+        _, centres, radii = self._instance_spheres()
+        visible = tuple(backend.spheres_in(centres, radii, planes))
+        meshes = self._meshes
+        if self._meshes_version != self.version:  # instances moved, nothing kept is right
+            meshes.clear()
+            self._meshes_version = self.version
+        mesh = meshes.get(visible)
+        if mesh is None:
+            mesh = meshes[visible] = self._build(visible)
+            if len(meshes) > self.kept:
+                meshes.popitem(last=False)  # least recently used
+        else:
+            meshes.move_to_end(visible)
+        self.mesh = mesh
+        return mesh
+
+    def _build(self, visible):
+        """
+        Expand some instances into one Mesh.
+        :param visible: iterable of instance positions
+        :return: Mesh
+        """
+        groups = {}  # Mesh -> visible instances using it
+        for i in visible:
+            instance = self.instances[i]
+            groups.setdefault(instance.mesh, []).append(instance)
+        new = Mesh()
+        for mesh, members in groups.items():
+            models = [instance.model for instance in members]
+            offsets = [instance.offset for instance in members]
+            vertex_start = new.vertex_count
+            index_start = len(new.index)
+            new.coords.extend(backend.expand(mesh.coords, models, offsets))
+            new.centres.extend(backend.expand(mesh.centres, models, offsets))
+            new.normals.extend(backend.expand(mesh.normals, models))
+
+            count = len(members)
+            new.index.extend(backend.repeat(mesh.index, count, mesh.vertex_count, vertex_start))
+            new.offsets.extend(backend.repeat(mesh.offsets[1:], count, len(mesh.index), index_start))
+
+            own_ids = array('i', [new.colour_id(c) for c in mesh.palette])
+            own_ids = array('i', [own_ids[c] for c in mesh.colour_ids])
+            for instance in members:
+                if instance.colour is None:
+                    new.colour_ids.extend(own_ids)
+                else:
+                    new.colour_ids.extend(array('i', [new.colour_id(instance.colour)]) * mesh.face_count)
+        return new
+
+    def _instance_spheres(self):
+        """Bounding spheres of every instance in the group's model space (memoised)."""
+        if self._spheres is not None and self._spheres[0] == self.version:
+            return self._spheres
+        centres = array('d')
+        radii = array('d')
+        for instance in self.instances:
+            centre, radius = self._mesh_bounds(instance.mesh)
+            centres.extend((instance.model @ centre + instance.offset)._value)
+            radii.append(radius * _stretch(instance.model))
+        self._spheres = (self.version, centres, radii)
+        return self._spheres
+
+    def _mesh_bounds(self, mesh):
+        """Bounding sphere of a mesh around the middle of its box (memoised)."""
+        res = self._bounds.get(mesh)
+        if res is None:
+            coords = mesh.coords
+            if not coords:
+                res = (V3.z, 0.0)
+            else:
+                lo = [min(coords[i::3]) for i in range(3)]
+                hi = [max(coords[i::3]) for i in range(3)]
+                centre = Vector3(tuple((a+b) / 2 for a, b in zip(lo, hi)))
+                cx, cy, cz = centre._value
+                it = iter(coords)
+                r2 = max((x-cx)**2 + (y-cy)**2 + (z-cz)**2 for x, y, z in zip(it, it, it))
+                res = (centre, sqrt(r2))
+            self._bounds[mesh] = res
+        return res
+
+
+def _stretch(m):
+    """Upper bound on how much a 3x3 matrix can lengthen a vector (1 for rotations)."""
+    g = (m.transpose() @ m)._value  # biggest eigenvalue is the square of the answer
+    return sqrt(max(abs(a) + abs(b) + abs(c) for a, b, c in g))
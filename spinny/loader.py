@@ -0,0 +1,171 @@
+"""
+Load Shapes from Wavefront OBJ and binary STL files.
+
+Both loaders stream straight into the flat arrays of a Mesh, so a model
+is only held in memory once. OBJ text is parsed line by line through
+generators, binary STL is read through mmap with struct.iter_unpack.
+Face normals and centres are computed in one go once the faces are in.
+
+load(path) picks the loader from the file extension.
+"""
+import mmap
+import os
+import struct
+from array import array
+
+from spinny import backend
+from spinny.colour import Colour
+from spinny.common import V3, M3
+from spinny.matrix import Vector3
+from spinny.mesh import Mesh
+from spinny.shapes import Shape
+
+
+STL_HEADER = 80
+STL_TRIANGLE = struct.Struct('<12x9f2x')  # skip normal and attribute bytes
+
+
+def load(path, colour='grey', size=None, shift=V3.z, trans=M3.e):
+    """
+    Load a model file into a Shape.
+    :param path: str, .obj or .stl file
+    :param colour: colour of faces without a material
+    :param size: float, scale the model to this size and centre it (default as is)
+    :param shift: Vector, moved by this after scaling and trans
+    :param trans: Matrix, applied to the model first
+    :return: Shape
+    """
+    ext = os.path.splitext(path)[1].lower()
+    loader = LOADERS.get(ext)
+    if loader is None:
+        raise ValueError('unknown model format: {}'.format(ext or path))
+    shape = Shape.from_mesh(loader(path, Colour(colour)))
+    shape.transform(trans)
+    if size is not None:
+        fit(shape, size)
+    shape.move_by(shift)
+    return shape
+
+
+def fit(shape, size):
+    """
+    Scale a Shape so its largest side is size and centre it on the origin.
+    :param shape: Shape
+    :param size: float
+    """
+    shape.materialise()  # measure it as it is in the world
+    coords = shape.mesh.coords
+    if not coords:
+        return
+    low = [min(coords[i::3]) for i in range(3)]
+    high = [max(coords[i::3]) for i in range(3)]
+    shape.move_by(-Vector3(tuple((l+h) / 2 for l, h in zip(low, high))))
+    side = max(h - l for l, h in zip(low, high))
+    if side:
+        shape.transform(M3.grow(size / side))
+
+
+def read_obj(path, colour):
+    """
+    Read a Wavefront OBJ file. Only vertices, faces and materials are used.
+    Materials take their colour from Kd in the mtllib, or by name.
+    :param path: str
+    :param colour: Colour of faces without a material
+    :return: Mesh
+    """
+    mesh = Mesh()
+    coords = mesh.coords
+    index = mesh.index
+    offsets = mesh.offsets
+    colour_ids = mesh.colour_ids
+    materials = {}
+    current = mesh.colour_id(colour)
+    folder = os.path.dirname(path)
+
+    with open(path) as fp:
+        for keyword, args in _records(fp):
+            if keyword == 'v':
+                coords.extend(map(float, args[:3]))
+            elif keyword == 'f':
+                count = len(coords) // 3  # negative indices count back from here
+                for corner in args:
+                    i = int(corner.partition('/')[0])
+                    index.append(i-1 if i > 0 else count+i)
+                offsets.append(len(index))
+                colour_ids.append(current)
+            elif keyword == 'usemtl':
+                name = args[0] if args else ''
+                c = materials.get(name) or Colour.COMMON_COLOURS.get(name)
+                current = mesh.colour_id(Colour(c) if c else colour)
+            elif keyword == 'mtllib':
+                for name in args:
+                    materials.update(read_mtl(os.path.join(folder, name)))
+
+    mesh.normals, mesh.centres = backend.face_geometry(coords, index, offsets)
+    return mesh
+
+
+def read_mtl(path):
+    """
+    Read diffuse colours from a material library.
+    :param path: str
+    :return: dict of material name -> rgb tuple (missing file gives {})
+    """
+    res = {}
+    if not os.path.exists(path):
+        return res
+    name = None
+    with open(path) as fp:
+        for keyword, args in _records(fp):
+            if keyword == 'newmtl':
+                name = args[0] if args else ''
+            elif keyword == 'Kd' and name is not None:
+                res[name] = tuple(min(int(float(x) * 255), 255) for x in args[:3])
+    return res
+
+
+def _records(lines):
+    """Yields (keyword, arguments) of every non-empty, non-comment line."""
+    for line in lines:
+        args = line.split('#', 1)[0].split()
+        if args:
+            yield args[0], args[1:]
+
+
+def read_stl(path, colour):
+    """
+    Read a binary STL file. Vertices are not shared between triangles,
+    use Shape.optimise to weld them. Stored normals are ignored.
+    :param path: str
+    :param colour: Colour of every face
+    :return: Mesh
+    """
+    mesh = Mesh()
+    with open(path, 'rb') as fp:
+        size = os.fstat(fp.fileno()).st_size
+        if size < STL_HEADER + 4:
+            raise ValueError('{} is too short for a binary STL file'.format(path))
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            count, = struct.unpack_from('<I', mm, STL_HEADER)
+            start = STL_HEADER + 4
+            end = start + count*STL_TRIANGLE.size
+            if end != size:
+                raise ValueError('{} is not a binary STL file (ASCII STL?)'.format(path))
+            coords = mesh.coords
+            extend = coords.extend
+            with memoryview(mm) as buf, buf[start:end] as triangles:  # no copy of the file
+                for triangle in STL_TRIANGLE.iter_unpack(triangles):
+                    extend(triangle)
+
+    mesh.index = array('i', range(3*count))
+    mesh.offsets = array('i', range(0, 3*count + 1, 3))
+    mesh.colour_ids = array('i', bytes(4*count))
+    mesh.colour_id(colour)
+    mesh.normals, mesh.centres = backend.face_geometry(mesh.coords, mesh.index, mesh.offsets)
+    return mesh
+
+
+LOADERS = {
+    '.obj': read_obj,
+    '.stl': read_stl,
+}
@@ -0,0 +1,252 @@
+"""
+Levels of detail, simplified versions of a Shape for when it is far away.
+
+Levels are made by edge collapse: the shortest edge is repeatedly merged
+into one vertex until few enough faces are left. Vertices where faces of
+different colours meet (or on the edge of an open surface) are locked in
+place, so colour borders and outlines keep their shape.
+"""
+import heapq
+from array import array
+from math import sqrt
+
+from spinny import backend
+from spinny.matrix import Vector3
+from spinny.mesh import Mesh
+from spinny.shapes import Shape, weld
+
+
+class LOD:
+    """
+    Picks between levels of detail of a Shape by their error on screen.
+
+    A level is good enough when its biggest collapsed edge, seen from the
+    camera, is shorter than tolerance pixels. Going back to a coarser level
+    needs some margin (HYSTERESIS) so levels don't flicker on the border.
+
+    Stands in for the Shape: mesh, bvh and the model transform are the
+    current level's. Moving and transforming goes to every level, that
+    only composes their model transforms.
+
+    select(self, pos, zoom) switches to the right level for a camera.
+
+    levels: list of Shapes, finest (the original) first.
+    errors: list of floats, model space size of each level's biggest collapsed edge.
+    level: int, position of the current level.
+    tolerance: float, error allowed on screen, in pixels.
+    """
+    HYSTERESIS = 0.75
+
+    def __init__(self, shape, ratios=(0.5, 0.25, 0.125, 0.0625), tolerance=2.0):
+        self.levels = [shape]
+        self.errors = [0.0]
+        for mesh, error in decimate(shape.mesh, ratios):
+            level = Shape.from_mesh(mesh)
+            level.model = shape.model
+            level.offset = shape.offset
+            self.levels.append(level)
+            self.errors.append(error)
+        self.level = 0
+        self.tolerance = tolerance
+
+    @property
+    def shape(self):
+        return self.levels[self.level]
+
+    @property
+    def mesh(self):
+        return self.shape.mesh
+
+    @property
+    def bvh(self):
+        return self.shape.bvh
+
+    @property
+    def model(self):
+        return self.shape.model
+
+    @property
+    def offset(self):
+        return self.shape.offset
+
+    def move_by(self, pos):
+        for level in self.levels:
+            level.move_by(pos)
+
+    def transform(self, m):
+        for level in self.levels:
+            level.transform(m)
+
+    def select(self, pos, zoom):
+        """
+        Switch to the coarsest level that still looks right.
+        :param pos: Vector, camera position in model space
+        :param zoom: float, pixels per unit at distance 1 (Projector.zoom)
+        :return: Shape, the current level
+        """
+        bvh = self.shape.bvh
+        if not bvh.node_count:
+            return self.shape
+        centre = Vector3(tuple(bvh.centres[0:3]))
+        distance = (centre - pos).length - bvh.radii[0]
+        if distance <= 0:
+            scale = float('inf')  # inside the bounds, full detail
+        else:
+            scale = zoom / distance  # pixels per unit at the near side
+
+        level = self.level
+        while level > 0 and self.errors[level] * scale > self.tolerance:
+            level -= 1  # too coarse, go finer straight away
+        limit = self.tolerance * self.HYSTERESIS
+        while level+1 < len(self.levels) and self.errors[level+1] * scale <= limit:
+            level += 1
+        self.level = level
+        return self.shape
+
+
+def decimate(mesh, ratios):
+    """
+    Simplify a mesh by collapsing edges, shortest first.
+    :param mesh: Mesh
+    :param ratios: decreasing fractions of the faces to keep, one per level
+    :return: list of (Mesh, error), error being the longest collapsed edge
+    """
+    coords, changes = weld(mesh.coords, 0)  # edges have to be shared
+    points = [list(coords[i:i+3]) for i in range(0, len(coords), 3)]
+    faces = []
+    for f in range(mesh.face_count):
+        face = _clean(changes[p] for p in mesh.face_points(f))
+        faces.append(face if len(face) >= 3 else None)
+    sides = [_orientation(points, face, mesh.normals[3*f:3*f+3]) for f, face in enumerate(faces)]
+
+    around = [set() for _ in points]  # vertex -> faces using it
+    edges = {}  # (low, high) vertex pair -> faces using that edge
+    for f, face in enumerate(faces):
+        if face is None:
+            continue
+        for a, b in zip(face, face[1:] + face[:1]):
+            around[a].add(f)
+            edges.setdefault((min(a, b), max(a, b)), []).append(f)
+    locked = [len({mesh.colour_ids[f] for f in fs}) > 1 for fs in around]
+    for (a, b), fs in edges.items():
+        if len(fs) != 2 or set(faces[fs[0]]) == set(faces[fs[1]]):  # open edge (or two sided)
+            locked[a] = locked[b] = True
+
+    heap = [(_length2(points, a, b), a, b) for a, b in edges]
+    heapq.heapify(heap)
+    alive = sum(face is not None for face in faces)
+    dead = [False] * len(points)
+    error = 0.0
+    res = []
+    for ratio in ratios:
+        target = int(mesh.face_count * ratio)
+        while alive > target and heap:
+            length2, a, b = heapq.heappop(heap)
+            if dead[a] or dead[b] or not around[a] & around[b]:
+                continue  # edge gone
+            if _length2(points, a, b) != length2:
+                continue  # moved since, a newer entry is in the heap
+            if locked[a] and locked[b]:
+                continue
+            if locked[b]:
+                a, b = b, a  # keep the locked one
+            target_pos = points[a] if locked[a] else [(x+y) / 2 for x, y in zip(points[a], points[b])]
+            if _flips(points, faces, sides, around[a] | around[b], a, b, target_pos):
+                continue
+
+            points[a] = target_pos
+            dead[b] = True
+            for f in around[b]:
+                old = faces[f]
+                face = _clean(a if p == b else p for p in old)
+                if len(face) < 3:
+                    faces[f] = None
+                    alive -= 1
+                    for p in old:
+                        if p != b:
+                            around[p].discard(f)
+                else:
+                    faces[f] = face
+                    around[a].add(f)
+            around[a] = {f for f in around[a] if faces[f] is not None}
+            around[b] = set()
+            error = max(error, sqrt(length2))
+            for f in around[a]:
+                for p in faces[f]:
+                    if p != a:
+                        heapq.heappush(heap, (_length2(points, a, p), min(a, p), max(a, p)))
+        res.append((_rebuild(mesh, points, faces, sides), error))
+    return res
+
+
+def _clean(points):
+    """List of points without repeats next to each other (cyclically)."""
+    res = []
+    for p in points:
+        if not res or res[-1] != p:
+            res.append(p)
+    while len(res) > 1 and res[0] == res[-1]:
+        res.pop()
+    return res
+
+
+def _newell(points, face):
+    """Un-normalised normal of a polygon, counter-clockwise from the front."""
+    nx = ny = nz = 0.0
+    x0, y0, z0 = points[face[-1]]
+    for p in face:
+        x1, y1, z1 = points[p]
+        nx += y0*z1 - z0*y1
+        ny += z0*x1 - x0*z1
+        nz += x0*y1 - y0*x1
+        x0, y0, z0 = x1, y1, z1
+    return nx, ny, nz
+
+
+def _orientation(points, face, direction):
+    """1 if the face winds counter-clockwise around its direction, else -1."""
+    if face is None:
+        return 1
+    n = _newell(points, face)
+    return 1 if sum(a*b for a, b in zip(n, direction)) >= 0 else -1
+
+
+def _flips(points, faces, sides, affected, a, b, pos):
+    """Check whether moving a and b to pos turns any face over."""
+    old_a, old_b = points[a], points[b]
+    before = {f: _newell(points, faces[f]) for f in affected}
+    points[a] = points[b] = pos
+    try:
+        for f in affected:
+            after = _newell(points, _clean(a if p == b else p for p in faces[f]))
+            if sum(x*y for x, y in zip(before[f], after)) < 0:
+                return True
+        return False
+    finally:
+        points[a], points[b] = old_a, old_b
+
+
+def _length2(points, a, b):
+    return sum((x-y)**2 for x, y in zip(points[a], points[b]))
+
+
+def _rebuild(mesh, points, faces, sides):
+    """Pack the surviving faces into a new Mesh, dropping unused vertices."""
+    new = Mesh()
+    renumber = {}
+    for f, face in enumerate(faces):
+        if face is None:
+            continue
+        for p in face:
+            if p not in renumber:
+                renumber[p] = len(renumber)
+                new.coords.extend(points[p])
+        new.index.extend(renumber[p] for p in face)
+        new.offsets.append(len(new.index))
+        new.colour_ids.append(new.colour_id(mesh.face_colour(f)))
+    new.normals, new.centres = backend.face_geometry(new.coords, new.index, new.offsets)
+    kept = [f for f, face in enumerate(faces) if face is not None]
+    for i, f in enumerate(kept):
+        if sides[f] < 0:  # wound the other way round, keep the original direction
+            new.normals[3*i:3*i+3] = array('d', (-x for x in new.normals[3*i:3*i+3]))
+    return new
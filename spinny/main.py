@@ -1,21 +1,34 @@
 #!/usr/bin/env python3
 
-import time
-from tkinter import Tk, Canvas, BOTH
+import argparse
+import json
+from tkinter import Tk, Canvas, PhotoImage, BOTH
 from math import pi
 
+from spinny import backend, cache, loader
 from spinny.shapes import ShapeCombination, Cube, SquarePyramid, Octagon, StickMan
-from spinny.matrix import Vector as V
+from spinny.matrix import Vector as V, Vector3
 from spinny.common import M3
-from spinny.camera import Camera, projection
-from spinny.colour import Shader
+from spinny.camera import Camera, Projector, CLIP
+from spinny.colour import Shader, ShadeCache
+from spinny.controls import Controls
 from spinny.infobox import InfoBox
+from spinny.instances import Instances
+from spinny.lod import LOD
+from spinny.pacing import FramePacer, QualityGovernor
+from spinny.pipeline import DisplayList, ScenePipeline
+from spinny.pool import PolygonPool
+from spinny.profiling import Profiler
+from spinny.raster import FrameBuffer, hex_to_bytes
+from spinny.recording import Recorder, Replay
+from spinny.tiles import TileRenderer
+from spinny.timing import FrameTimer
 
 
 CURSOR_VIS = {False: 'none', True: ''}
 PAUSE_TEXT = {False: '', True: 'PAUSED'}
 obj_rotator = M3.z_rot(pi / 32)  # very small angle
-SUN_VECTOR = V((1,0,-1)).unit
+SUN_VECTOR = Vector3((1,0,-1)).unit
 
 
 def draw_circle(v, r, canvas, colour='black'):
@@ -40,21 +53,26 @@ def draw_circle(v, r, canvas, colour='black'):
 
 class Spinny:
     KEY_BINDINGS = {  # TODO make dynamic?
-        'w': V((0,1,0)),
-        'a': V((-1,0,0)),
-        's': V((0,-1,0)),
-        'd': V((1,0,0)),
-        'space': V((0,0,1)),
-        'q': V((0,0,-1)),
+        'w': Vector3((0,1,0)),
+        'a': Vector3((-1,0,0)),
+        's': Vector3((0,-1,0)),
+        'd': Vector3((1,0,0)),
+        'space': Vector3((0,0,1)),
+        'q': Vector3((0,0,-1)),
     }
 
-    def __init__(self, root, shape):
+    def __init__(self, root, shape, canvas=None, raster=False, raster_scale=2, raster_workers=0, lod=False,
+                 threaded=False, target_fps=30, adaptive=False):
         self.root = root
-        self.shape = shape
+        self.shape = LOD(shape) if lod else shape  # LOD picks a level every frame
 
-        self.canvas = Canvas(self.root)
+        self.canvas = Canvas(self.root) if canvas is None else canvas
+        self.pool = PolygonPool(self.canvas)
         self.camera = Camera()
         self.shader = Shader()
+        self.shades = ShadeCache(self.shader, SUN_VECTOR)  # only used by whichever thread runs build_frame
+        self._lit_model = None  # model matrix _sun was made for
+        self._sun = SUN_VECTOR  # in model space
 
         self.root.title('Spinny')
         self.root.attributes('-fullscreen', True)
@@ -67,8 +85,21 @@ class Spinny:
         self.height = self.root.winfo_height()
 
         self.centre = V((self.width//2, self.height//2))
-        self.refresh = 30
-        self.mouse = [0, 0]
+        self.raster_scale = raster_scale
+        self.raster_workers = raster_workers  # 0 rasterises in this process
+        self.framebuffer = None  # software rasteriser, see toggle_raster
+        self.tiles = None
+        self.present = self.show_frame
+        self.photo = self.display = self.image_item = None
+        if raster:
+            self.toggle_raster()
+        # started after the tile pool, so its processes aren't forked from a threaded one
+        self.pipeline = ScenePipeline(self.build_frame) if threaded else None  # scene maths off the tk thread
+        self.pacer = FramePacer(target_fps)  # when the next frame starts
+        self.governor = QualityGovernor(self.pacer.budget) if adaptive else None  # detail vs speed
+        self.quality = QualityGovernor.LEVELS[0]  # (min_area, shade_levels)
+        self.controls = Controls(self.KEY_BINDINGS)  # applied once per frame
+        self.profiler = None  # see profile
         self.paused = False
         self.paused_text = self.canvas.create_text(
             self.centre[0],
@@ -80,12 +111,12 @@ class Spinny:
         self.pause_motion()
 
         self.counter = 0
-        self.time_one = 0
         self.time_min = float('inf')
         self.time_tot = 0
         self.time_max = 0
 
-        self.infobox = InfoBox(self.canvas, (5,5), 100)
+        self.timer = FrameTimer()
+        self.infobox = InfoBox(self.canvas, (5,5), 100, interval=0.25)  # 4Hz
         self.infobox.add('x', default='X = {}', rounding=2)
         self.infobox.add('y', default='Y = {}', rounding=2)
         self.infobox.add('z', default='Z = {}', rounding=2)
@@ -95,137 +126,327 @@ class Spinny:
         self.infobox.add('min', default='min {}ms', rounding=1)
         self.infobox.add('frame', default='avg {}ms', rounding=1)
         self.infobox.add('max', default='max {}ms', rounding=1)
+        self.infobox.add('quality', default='quality -{}')
+        self.infobox.add_graph(height=40, scale=50)  # frame times up to 50ms
 
-        self._key_repeat_freq = 10
-        self._key_repeat_pressed = {}
         for key in self.KEY_BINDINGS:
-            self._key_repeat_pressed[key] = True
-            self.canvas.bind_all('<KeyPress-{} >'.format(key), self.move_key_press)
+            self.canvas.bind_all('<KeyPress-{}>'.format(key), self.move_key_press)
             self.canvas.bind_all('<KeyRelease-{}>'.format(key), self.move_key_release)
 
         self.canvas.bind('<Motion>', self.turn_input)  # mouse
         self.canvas.bind_all('<p>', self.toggle_motion)
         self.canvas.bind_all('<Escape>', self.toggle_motion)
-        self.canvas.bind_all('<Leave>', self.pause_motion)
+        self.canvas.bind_all('<Leave>', self.leave)
         self.canvas.bind_all('<Control-r>', self.reset_camera)
         self.canvas.bind_all('<Control-q>', self.quit)
+        self.canvas.bind_all('<Control-t>', self.save_timings)
+        self.canvas.bind_all('<Control-m>', self.toggle_raster)
 
     @property
     def fps(self):
-        return 1000 / (self.time_one + self.refresh)
+        return self.pacer.fps  # measured, not guessed
 
     def start(self):
         self.draw()
         self.root.mainloop()
+        if self.profiler is not None:  # window closed before the frames were up
+            self.profiler.stop()
+        if self.controls.recorder is not None:
+            self.controls.recorder.close()
+        if isinstance(self.controls, Replay):
+            print(json.dumps(self.controls.summary(), indent=2))
+
+    def record(self, path):
+        """
+        Record every frame's input and camera pose to a file, see recording.
+        :param path: str
+        :return: Recorder
+        """
+        self.controls.recorder = Recorder(path, self.KEY_BINDINGS, self.pacer.budget / 1000)
+        return self.controls.recorder
+
+    def replay(self, path, exact=True):
+        """
+        Drive the camera from a recording instead of the mouse and keyboard.
+        Unpauses, so it plays from the first frame, and quits at the end of
+        it, printing a frame time summary.
+        :param path: str
+        :param exact: bool, follow the recorded poses (else re-run the input)
+        :return: Replay
+        """
+        self.controls = Replay(path, self.KEY_BINDINGS, exact)
+        if self.paused:
+            self.paused = False  # not toggle_motion, start draws the first frame
+            self.root.config(cursor=CURSOR_VIS[False])
+            self.canvas.itemconfig(self.paused_text, text=PAUSE_TEXT[False])
+        return self.controls
+
+    def profile(self, path='spinny_profile', frames=None, allocations=False):
+        """
+        Profile from now on, writing the results when the app stops.
+        The scene maths moves back onto the tk thread, where cProfile sees it.
+        :param path: str, output files start with this, see profiling
+        :param frames: int, quit after this many frames (None runs until closed)
+        :param allocations: bool, also report objects created and memory held per frame by call site
+        :return: Profiler
+        """
+        if self.pipeline is not None:
+            self.pipeline.close()
+            self.pipeline = None
+        self.profiler = Profiler(path, frames=frames, allocations=allocations)
+        self.profiler.start()
+        return self.profiler
 
     def draw(self):
-        t = time.time()
-        self.canvas.delete('clearable')
-
-        self.camera.turn(*self.mouse_to_angles())  # stick mouse in the middle
-        self.root.event_generate(
-            '<Motion>',
-            warp=True,
-            x=self.centre[0],
-            y=self.centre[1],
-        )
-        self.mouse = [0, 0]
-
-        converted_points = []
-
-        for v in self.shape.points:
-            converted = projection(v, self.camera, self.centre)
-            converted_points.append(converted)
-            # draw_circle(converted, 3-v._value[2], canvas, 'red')
-
-        faces = []
-        for face in self.shape.faces:
-            cam_to_face = face.centre - self.camera.pos
-            if self.camera.view @ cam_to_face <= 0:
-                # skip if face behind the camera
-                continue
-            if face.direction @ -cam_to_face <= 0:
-                # skip if camera is behind face
-                continue
-            faces.append(face)
-        faces = sorted(  # sort faces by distance of centre from camera
-            faces,
-            key=lambda f: (f.centre - self.camera.pos).length,
-            reverse=True
-        )
-
-        for face in faces:
-            for tri in face.tri_iter():
-                shade_rating = -(SUN_VECTOR @ face.direction)
-                shade_adj = self.shader.shade(shade_rating)
-                self.canvas.create_polygon(
-                    *(converted_points[p]._value for p in tri),
-                    tag='clearable',
-                    fill=face.colour.adjust_value(shade_adj).hx
-                    #outline='black',
-                )
-
-            # continue
-            # draw_circle(projection(face.centre,self.camera,self.centre),2,self.canvas, face.colour)
-            # self.canvas.create_line(
-            #     *projection(face.centre, self.camera, self.centre)._value,
-            #     *projection(face.centre+face.direction, self.camera, self.centre)._value,
-            #     tag='clearable',
-            # )
-
-        self.shape.transform(obj_rotator)  # yo linear algebra works
+        timer = self.timer
+        if self.profiler is not None:
+            self.profiler.begin_frame()
+        timer.begin()
+        self.pacer.begin()
+        self.canvas.delete('clearable')  # debug drawings, see draw_circle
+
+        if self.controls.apply(self.camera):  # mouse moved, stick it back in the middle
+            self.root.event_generate(
+                '<Motion>',
+                warp=True,
+                x=self.centre[0],
+                y=self.centre[1],
+            )
+        timer.lap('input')
+
+        shape = self.shape
+        snapshot = self.snapshot()
+        timer.lap('culling')  # level of detail, instances in view
+        if self.pipeline is None:
+            frame = self.build_frame(snapshot, timer)
+        else:
+            frame = self.pipeline.take()  # newest frame the worker finished
+            self.pipeline.submit(snapshot)  # and it starts on the next one
+        if frame is not None:
+            self.paint(frame)
+
+        # draw_circle(projection(face.centre,self.camera,self.centre),2,self.canvas, face.colour)
+        # self.canvas.create_line(
+        #     *projection(face.centre, self.camera, self.centre)._value,
+        #     *projection(face.centre+face.direction, self.camera, self.centre)._value,
+        #     tag='clearable',
+        # )
+        timer.lap('emit')
+
+        shape.transform(obj_rotator)  # yo linear algebra works, just one matrix product now
+        timer.lap('spin')
 
         self.counter += 1
         self.update_text()
-        dur = (time.time() - t) * 1000
+        timer.lap('infobox')
+        dur = timer.end()
         self.time_tot += dur
         if dur < self.time_min:
             self.time_min = dur
         elif dur > self.time_max:
             self.time_max = dur
 
-        if self.counter%5 == 0:
-            self.time_one = dur
-
+        cost = dur
+        if self.pipeline is not None and self.pipeline.timer.totals:
+            cost = max(cost, self.pipeline.timer.totals[-1])  # worker runs alongside
+        if self.governor is not None:
+            self.quality = self.governor.update(cost)
+        if isinstance(self.controls, Replay):
+            self.controls.times.append(cost)
+            if self.controls.done:  # start prints the summary
+                self.quit()
+                return
+
+        if self.profiler is not None and self.profiler.end_frame():  # profiled enough
+            self.quit()
+            return
         if not self.paused:
-            self.root.after(self.refresh, self.draw)
+            self.root.after(self.pacer.delay(), self.draw)
+
+    def snapshot(self):
+        """
+        Everything build_frame needs, taken on the tk thread. The worker
+        only gets these, never the shape, which spinning and input change
+        between frames. Picks the level of detail or the instances in view
+        on the way.
+        :return: (Projector in model space, Mesh, BVH or None, raster bool,
+            (min_area, shade_levels), sun Vector in model space)
+        """
+        fb = self.framebuffer
+        if fb is None:
+            projector = Projector(self.camera, self.centre)  # once per frame
+        else:  # straight to framebuffer pixels
+            projector = Projector(
+                self.camera,
+                V((fb.width/2, fb.height/2)),
+                zoom=800/self.raster_scale,
+            )
+        shape = self.shape
+        model = shape.model
+        projector = projector.local(model, shape.offset)  # mesh stays in model space
+        if isinstance(shape, LOD):
+            shape.select(projector.pos, projector.zoom)
+        elif isinstance(shape, Instances):
+            shape.expand(projector.planes)  # copies in view, into one mesh
+        if model is not self._lit_model:  # sun into model space
+            self._lit_model = model
+            self._sun = model.transpose() @ SUN_VECTOR
+        mesh = shape.mesh
+        mesh.triangles  # fanned here, so the worker never writes the memo
+        return projector, mesh, shape.bvh, fb is not None, self.quality, self._sun
+
+    def build_frame(self, snapshot, timer):
+        """
+        Does the scene maths of a frame: projection, culling, sorting and
+        shading. Touches neither tk nor the shape, only the snapshot (and
+        self.shades), so it can run on the pipeline's worker.
+        :param snapshot: from self.snapshot
+        :param timer: FrameTimer to charge the stages to
+        :return: DisplayList
+        """
+        projector, mesh, bvh, raster, (min_area, shade_levels), sun = snapshot
+        converted_points, codes = backend.project(
+            mesh.coords, projector, depth=raster, codes=True,
+        )
+        timer.lap('projection')
+
+        candidates = None if bvh is None else bvh.query(projector.planes)  # skip whole groups out of view
+        faces, depths = backend.cull_faces(mesh, projector.pos, projector.forward, candidates, codes)
+        timer.lap('culling')
+        faces = backend.depth_sort(faces, depths)  # furthest first
+        timer.lap('sort')
+        clips = backend.face_codes(mesh, codes, faces)[1]  # faces crossing the near plane
+        timer.lap('culling')
+
+        shades = self.shades
+        if shade_levels != shades.levels:  # coarser shading, fewer fill changes
+            shades.levels = shade_levels
+        if sun is not shades.sun:
+            shades.sun = sun
+        fills = shades.face_fills(mesh, faces)
+        timer.lap('shading')
+
+        points = converted_points
+        tris, starts = mesh.triangles  # fanned once, not every frame
+        if raster:
+            min_area /= self.raster_scale ** 2  # framebuffer pixels are bigger
+        min2 = 2 * min_area  # compared with twice the area, no halving
+        items = []
+        add = items.append
+        if not raster:
+            for f, fill, clip in zip(faces, fills, clips):
+                if clip & CLIP:  # project the visible part
+                    poly = projector.clip(mesh.face_coords(f), clip)
+                    for i in range(1, len(poly)-1):
+                        add(([poly[0], poly[i], poly[i+1]], fill))
+                    continue
+                for t in range(3*starts[f], 3*starts[f+1], 3):
+                    a, b, c = points[tris[t]], points[tris[t+1]], points[tris[t+2]]
+                    if min2 and abs((b[0]-a[0])*(c[1]-a[1]) - (b[1]-a[1])*(c[0]-a[0])) < min2:
+                        continue  # too small to matter at this quality
+                    add(([a, b, c], fill))
+        else:
+            for f, fill, clip in zip(reversed(faces), reversed(fills), reversed(clips)):  # less overdraw
+                rgb = hex_to_bytes(fill)
+                if clip & CLIP:
+                    poly = projector.clip(mesh.face_coords(f), clip, depth=True)
+                    for i in range(1, len(poly)-1):
+                        add((poly[0], poly[i], poly[i+1], rgb))
+                    continue
+                for t in range(3*starts[f], 3*starts[f+1], 3):
+                    a, b, c = points[tris[t]], points[tris[t+1]], points[tris[t+2]]
+                    if min2 and abs((b[0]-a[0])*(c[1]-a[1]) - (b[1]-a[1])*(c[0]-a[0])) < min2:
+                        continue
+                    add((a, b, c, rgb))
+        timer.lap('emit')
+        return DisplayList(raster, items)
+
+    def paint(self, frame):
+        """
+        Hands a display list to the canvas (or the rasteriser).
+        :param frame: DisplayList, from build_frame
+        """
+        if frame.raster != (self.framebuffer is not None):
+            return  # made before the renderer was switched
+        if not frame.raster:
+            draw = self.pool.draw
+            self.pool.begin()
+            for coords, fill in frame.items:
+                draw(coords, fill)
+            self.pool.end()
+        else:
+            self.rasterise(frame.items)
+
+    def rasterise(self, triangles):
+        """
+        Draws triangles into the framebuffer and presents it.
+        :param triangles: iterable of (a, b, c, rgb), corners (x, y, 1/depth)
+        """
+        fb = self.framebuffer
+        if self.tiles is None:
+            fb.clear()
+            triangle = fb.triangle
+            for a, b, c, rgb in triangles:
+                triangle(a, b, c, rgb)
+        else:
+            self.tiles.render(triangles)
+        self.present(fb)
+
+    def show_frame(self, fb):
+        """Shows framebuffer on the canvas as a single image."""
+        if self.photo is None:
+            self.photo = PhotoImage(master=self.root, width=fb.width, height=fb.height)
+            self.display = self.photo
+            if self.raster_scale > 1:
+                self.display = PhotoImage(master=self.root, width=self.width, height=self.height)
+            self.image_item = self.canvas.create_image(
+                0, 0,
+                anchor='nw',
+                image=self.display,
+                tag='frame',
+            )
+            self.canvas.tag_lower(self.image_item)
+        self.photo.configure(data=fb.ppm(), format='PPM')
+        if self.display is not self.photo:
+            s = self.raster_scale
+            self.display.tk.call(self.display, 'copy', self.photo, '-zoom', s, s)
+
+    def toggle_raster(self, *args):
+        """Switches between tk polygons and the software rasteriser. Allows tk Event arguments."""
+        if self.framebuffer is None:
+            size = (self.width // self.raster_scale, self.height // self.raster_scale)
+            if self.raster_workers:
+                self.tiles = TileRenderer(*size, workers=self.raster_workers)
+                self.framebuffer = self.tiles.framebuffer
+            else:
+                self.framebuffer = FrameBuffer(*size)
+            self.pool.clear()
+        else:
+            self.framebuffer = None
+            if self.tiles is not None:
+                self.tiles.close()
+                self.tiles = None
+            if self.image_item is not None:
+                self.canvas.delete(self.image_item)
+            self.photo = self.display = self.image_item = None
 
     def turn_input(self, event):
         """Handles tk events for mouse turning."""
         if self.paused:
             return
 
-        if (event.x, event.y) != self.centre._value:
-            self.mouse[0] += event.x - self.centre._value[0]
-            self.mouse[1] += event.y - self.centre._value[1]
+        cx, cy = self.centre._value
+        if (event.x, event.y) != (cx, cy):  # not our own warp
+            self.controls.look(event.x - cx, event.y - cy)
 
     def move_key_press(self, event):
-        """Handles tk events for moving with keyboard."""
-        # deals with keyboard repeat delay
+        """Handles tk events for moving with keyboard. Only marks the key as held."""
         if self.paused:
             return
-
-        key = event.keysym
-        self.camera.move(self.KEY_BINDINGS[key])  # TODO .get with default zero maybe?
-
-        if self._key_repeat_pressed[key]:
-            self.root.after(self._key_repeat_freq, self.move_key_press, event)
+        self.controls.press(event.keysym)
 
     def move_key_release(self, event):
-        key = event.keysym
-        if self._key_repeat_pressed[key]:
-            self._key_repeat_pressed[key] = False
-            self.root.after(self._key_repeat_freq+1, self.move_key_release, event)
-        else:
-            self._key_repeat_pressed[key] = True
-
-    def mouse_to_angles(self):  # move to Camera? Doesn't use tk.
-        """Converts mouse position to x and z angles in radians."""
-        mx, my = self.mouse
-        self.mouse = [0,0]
-        x_angle = -my * pi / 1000  # TODO make denominator the sensitivity?
-        z_angle = -mx * pi / 1000  # mx < 0  <=>  delta θz > 0
-        return x_angle, z_angle
+        self.controls.release(event.keysym)
 
     def update_text(self):
         """Updates InfoBox."""
@@ -239,6 +460,8 @@ class Spinny:
             self.time_min,
             self.time_tot / self.counter,
             self.time_max,
+            0 if self.governor is None else self.governor.level,
+            graph=self.timer.totals,
         )
 
     def pause_motion(self, *args):
@@ -246,17 +469,32 @@ class Spinny:
         if not self.paused:
             self.toggle_motion()  # keep the pause code in one place
 
+    def leave(self, *args):
+        """Pauses app when the pointer leaves, unless replaying. Allows tk Event arguments."""
+        if not isinstance(self.controls, Replay):  # the pointer isn't steering
+            self.pause_motion()
+
     def toggle_motion(self, *args):
         """Toggles app pause. Allows tk Event arguments."""
         self.paused = not self.paused
+        self.controls.clear()  # no moving on with keys let go while paused
         self.root.config(cursor=CURSOR_VIS[self.paused])
         self.canvas.itemconfig(self.paused_text, text=PAUSE_TEXT[self.paused])
         if not self.paused:
             self.draw()
 
     def quit(self, *args):
+        if self.pipeline is not None:
+            self.pipeline.close()
+        if self.tiles is not None:
+            self.tiles.close()
         self.root.destroy()
 
+    def save_timings(self, *args, path='spinny_timings.jsonl'):
+        """Writes recent per-stage frame times as JSON lines. Allows tk Event arguments."""
+        with open(path, 'w') as fp:
+            self.timer.export(fp)
+
     def reset_camera(self, *args):
         """Creates new Camera, resetting position and angles. Allows tk Event arguments."""
         self.camera = Camera()  # TODO add a way of resetting to non-standard camera?
@@ -278,8 +516,43 @@ myShape = ShapeCombination(
     myShape,
 )
 
-def start():
+def start(argv=None):
+    parser = argparse.ArgumentParser(prog='python3 -m spinny')
+    parser.add_argument('model', nargs='?', help='.obj or binary .stl file to show')
+    parser.add_argument('--size', type=float, default=4, help='scale the model to this size')
+    parser.add_argument('--cache', metavar='FILE', help='keep the processed model in FILE for fast startup')
+    parser.add_argument('--lod', action='store_true', help='draw simplified versions of the model from far away')
+    parser.add_argument('--single-thread', action='store_true', help='do the scene maths on the tk thread too')
+    parser.add_argument('--fps', type=float, default=30, help='target frame rate')
+    parser.add_argument('--adaptive', action='store_true', help='lower the detail when frames run over budget')
+    parser.add_argument('--profile', nargs='?', const='spinny_profile', metavar='PATH',
+                        help='profile the run, writing PATH.pstats and PATH.collapsed')
+    parser.add_argument('--frames', type=int, help='with --profile, quit after this many frames')
+    parser.add_argument('--allocations', action='store_true',
+                        help='with --profile, also write objects created per frame to PATH.alloc.jsonl')
+    parser.add_argument('--record', metavar='FILE', help='record input and camera poses to FILE')
+    parser.add_argument('--replay', metavar='FILE', help='drive the camera from a recording, then print frame times')
+    parser.add_argument('--replay-input', action='store_true',
+                        help='with --replay, re-run the recorded input instead of following its poses')
+    args = parser.parse_args(argv)
+
+    shape = myShape
+    if args.model is not None:
+        shape = cache.cached(
+            args.cache,
+            cache.source_key(args.model, args.size),
+            lambda: loader.load(args.model, size=args.size),
+        )
     root = Tk()
-    spinny = Spinny(root, myShape)
+    spinny = Spinny(
+        root, shape, lod=args.lod, threaded=not (args.single_thread or args.profile),
+        target_fps=args.fps, adaptive=args.adaptive,
+    )
+    if args.profile is not None:
+        spinny.profile(args.profile, frames=args.frames, allocations=args.allocations)
+    if args.replay is not None:
+        spinny.replay(args.replay, exact=not args.replay_input)
+    if args.record is not None:
+        spinny.record(args.record)
     spinny.start()
 
@@ -3,6 +3,7 @@ from operator import mul, add
 
 
 class VectorSpace:
+    __slots__ = ()
     _IS_MATRIX = False
     _IS_VECTOR = False
 
@@ -42,9 +43,13 @@ class Matrix(VectorSpace):  # TODO extract matrix and common to linalg module?
 
     Supports addition (+), subtraction (-),
     negation (-m), scaling (*),
-    matrix multiplication(@), powers (**).
+    matrix multiplication(@), integer powers (**).
 
     det(self) returns determinant (memoised).
+    lu(self) returns the LU decomposition (memoised).
+    inverse(self) returns the inverse matrix.
+    solve(self, b) solves self @ x = b for x.
+    identity(n) returns the n by n identity matrix.
     transpose(m) returns m transposed.
     row_switch(self, i, j) elementary row operation swap.
     row_mult(self, i, m) elementary row operation multiply.
@@ -53,6 +58,7 @@ class Matrix(VectorSpace):  # TODO extract matrix and common to linalg module?
     size: (#rows, #cols)
     is_square: #rows == #cols
     """
+    __slots__ = ('_value', 'size', 'is_square', '_det', '_lu', '_hash')
     _IS_MATRIX = True
 
     def __init__(self, rows, det=None):  # assumes input is tuple of tuples!
@@ -62,6 +68,18 @@ class Matrix(VectorSpace):  # TODO extract matrix and common to linalg module?
         self.size = (m, n)
         self.is_square = m == n
         self._det = det
+        self._lu = None
+        self._hash = None
+
+    @staticmethod
+    def identity(n):
+        """
+        :param n: int, size
+        :return: n by n identity Matrix
+        """
+        return Matrix(tuple(
+            tuple(int(i == j) for j in range(n)) for i in range(n)
+        ), 1)
 
     @property
     def det(self):
@@ -89,9 +107,87 @@ class Matrix(VectorSpace):  # TODO extract matrix and common to linalg module?
                     v[0][2]*(v[1][0]*v[2][1] - v[1][1]*v[2][0])
                 )  # I would feel bad about doing this if it wasn't the best way
             else:
-                raise NotImplementedError('High order det not implemented yet')
+                lu, _, sign = self.lu
+                det = sign
+                for i in range(m):
+                    det *= lu[i][i]
+                self._det = det
         return self._det
 
+    @property
+    def lu(self):
+        """
+        LU decomposition with partial pivoting, so that P @ self = L @ U.
+        L (unit diagonal, left out) and U are packed into one table.
+        A singular matrix gives a zero on the diagonal of U.
+        :return: (table as tuple of tuples, row order of P as tuple, sign of P)
+        """
+        if self._lu is None:
+            if not self.is_square:
+                raise ValueError('LU decomposition needs a square matrix')
+            n = self.size[0]
+            a = [list(row) for row in self._value]
+            order = list(range(n))
+            sign = 1
+            for k in range(n):
+                p = max(range(k, n), key=lambda i: abs(a[i][k]))
+                if p != k:
+                    a[k], a[p] = a[p], a[k]
+                    order[k], order[p] = order[p], order[k]
+                    sign = -sign
+                pivot_row = a[k]
+                pivot = pivot_row[k]
+                if pivot == 0:
+                    continue  # whole column is zero from here down, nothing to eliminate
+                for i in range(k+1, n):
+                    row = a[i]
+                    if row[k] == 0:
+                        continue
+                    f = row[k] = row[k] / pivot
+                    for j in range(k+1, n):
+                        row[j] -= f * pivot_row[j]
+            self._lu = (tuple(map(tuple, a)), tuple(order), sign)
+        return self._lu
+
+    def solve(self, b):
+        """
+        Solve self @ x = b by forward and back substitution on the LU
+        decomposition, raises ZeroDivisionError if self is singular.
+        :param b: Vector, or Matrix to solve for each column
+        :return: x, same type as b
+        """
+        lu, order, _ = self.lu
+        n = self.size[0]
+        if b._IS_VECTOR:
+            columns = (b._value,)
+        else:
+            columns = tuple(zip(*b._value))
+        res = []
+        for col in columns:
+            x = [col[i] for i in order]
+            for i in range(n):  # L has ones on the diagonal
+                row = lu[i]
+                x[i] -= sum(row[j] * x[j] for j in range(i))
+            for i in reversed(range(n)):
+                row = lu[i]
+                if row[i] == 0:
+                    raise ZeroDivisionError('Singular matrix')
+                x[i] = (x[i] - sum(row[j] * x[j] for j in range(i+1, n))) / row[i]
+            res.append(tuple(x))
+        if b._IS_VECTOR:
+            return type(b)(res[0])
+        return Matrix(tuple(zip(*res)))
+
+    @property
+    def inverse(self):
+        """
+        Inverse from the LU decomposition, raises ZeroDivisionError if singular.
+        :return: Matrix
+        """
+        res = self.solve(Matrix.identity(self.size[0]))
+        res._det = 1 / self.det
+        return type(self)(res._value, res._det)
+
     def __repr__(self):
         res_parts = []
         for row in self._value:
@@ -116,17 +212,17 @@ class Matrix(VectorSpace):  # TODO extract matrix and common to linalg module?
             self._value[pos] = x
 
     def __add__(self, other):
-        if other is 0:
-            # for sum()
-            # this causes a warning but
-            # I thought about it and "is 0" is what I want
+        if type(other) is int and other == 0:  # from sum()
             return self
         #size = self.size
         #if size != other.size:
         #    raise ValueError('Different Sizes!')
         m, n = self.size
         a = self._value
-        b = other._value
+        try:
+            b = other._value
+        except AttributeError:  # no adding scalars
+            return NotImplemented
         c = tuple(
             tuple(
                 a[i][j] + b[i][j] for j in range(n)
@@ -145,7 +241,7 @@ class Matrix(VectorSpace):  # TODO extract matrix and common to linalg module?
         )
 
         if (det := self._det) is not None:
-            det *= a
+            det *= a ** m  # every row gets scaled
         return Matrix(c, det)
 
     def __matmul__(self, other):
@@ -170,16 +266,31 @@ class Matrix(VectorSpace):  # TODO extract matrix and common to linalg module?
 
         return Matrix(c, det)
 
-    def __pow__(self, other):
-        # TODO: update to matmul (preferably without creating n Matrix objs)
-        raise NotImplementedError('see todo')
-        res = self
-        for x in range(other-1):
-            res *= self
-        return res
+    def __pow__(self, n):
+        """
+        Integer power by repeated squaring, log2(n) multiplications.
+        Negative powers are powers of the inverse.
+        """
+        if not self.is_square:
+            raise ValueError('Only square matrices have powers')
+        if n < 0:
+            return self.inverse ** -n
+        if n == 0:
+            return type(self)(Matrix.identity(self.size[0])._value, 1)
+        res = None
+        square = self
+        while True:
+            if n & 1:
+                res = square if res is None else res @ square
+            n >>= 1
+            if not n:
+                return res
+            square = square @ square
 
     def __eq__(self, other):
-        return hash(self) == hash(other)
+        if not isinstance(other, VectorSpace):
+            return NotImplemented
+        return other._IS_MATRIX and self._value == other._value
 
     def __hash__(self):
         if (res := self._hash) is None:
@@ -207,39 +318,47 @@ class Matrix(VectorSpace):  # TODO extract matrix and common to linalg module?
 
     def row_switch(self, i, j):
         """
-        NOT UPDATED FOR IMMUTABLE MATRICES
         Swap row positions.
         :param i: index of row 1
         :param j: index of row 2
+        :return: new Matrix
         """
-        raise NotImplementedError('see todo')
-        self._value[i], self._value[j] = self._value[j], self._value[i]
+        rows = list(self._value)
+        rows[i], rows[j] = rows[j], rows[i]
+        det = self._det
+        if det is not None and i != j:
+            det = -det
+        return type(self)(tuple(rows), det)
 
     def row_mult(self, i, m):
         """
-        NOT UPDATED FOR IMMUTABLE MATRICES
         Multiply a row by a scalar.
         :param i: index of row
         :param m: non-zero scalar
+        :return: new Matrix
         """
-        raise NotImplementedError('see todo')
         if m == 0:
             raise ValueError("m can't be zero!")
-        self._value[i] = [m*x for x in self._value[i]]
+        rows = list(self._value)
+        rows[i] = tuple(m*x for x in rows[i])
+        det = self._det
+        if det is not None:
+            det *= m
+        return type(self)(tuple(rows), det)
 
     def row_add(self, i, j, m):
         """
-        NOT UPDATED FOR IMMUTABLE MATRICES
         Add a row to another (with scaling).
         :param i: index of row to be changed
         :param j: index of row to add
         :param m: non-zero scalar
-        :return:
+        :return: new Matrix
         """
-        raise NotImplementedError('see todo')
         if m == 0:
             raise ValueError("m can't be zero!")
-        self._value[i] = [x+m*y for x, y in zip(self._value[i], self._value[j])]
+        rows = list(self._value)
+        rows[i] = tuple(x + m*y for x, y in zip(rows[i], rows[j]))
+        return type(self)(tuple(rows), self._det)  # determinant stays
 
 
 class Vector(VectorSpace):
@@ -261,6 +380,7 @@ class Vector(VectorSpace):
     size: #entries
     """
 
+    __slots__ = ('_value', 'size', '_length')
     _IS_VECTOR = True
 
     def __init__(self, values):
@@ -280,14 +400,14 @@ class Vector(VectorSpace):
         return self._value[pos]
 
     def __add__(self, other):
-        if other is 0:
-            # for sum()
-            # this causes a warning but
-            # I thought about it and "is 0" is what I want
+        if type(other) is int and other == 0:  # from sum()
             return self
 
         a = self._value
-        b = other._value
+        try:
+            b = other._value
+        except AttributeError:  # no adding scalars
+            return NotImplemented
         return Vector(tuple(map(add, a, b)))
 
     def __mul__(self, a):  # scalar multiplication only!
@@ -382,3 +502,298 @@ class Vector(VectorSpace):
         return bound * self.unit
 
 
+class Vector2(Vector):
+    """
+    Vector with exactly 2 entries and unrolled arithmetic.
+
+    Interchangeable with a size 2 Vector, results stay Vector2 where possible.
+    """
+    __slots__ = ()
+
+    def __init__(self, values):
+        self._value = values
+        self.size = 2
+        self._length = None
+
+    def __add__(self, other):
+        if type(other) is int and other == 0:  # from sum()
+            return self
+        a0, a1 = self._value
+        try:
+            b0, b1 = other._value
+        except AttributeError:  # no adding scalars
+            return NotImplemented
+        return Vector2((a0+b0, a1+b1))
+
+    def __sub__(self, other):
+        a0, a1 = self._value
+        b0, b1 = other._value
+        return Vector2((a0-b0, a1-b1))
+
+    def __neg__(self):
+        a0, a1 = self._value
+        return Vector2((-a0, -a1))
+
+    def __mul__(self, a):
+        b0, b1 = self._value
+        return Vector2((a*b0, a*b1))
+
+    def __matmul__(self, other):
+        a0, a1 = self._value
+        b0, b1 = other._value
+        return a0*b0 + a1*b1
+
+
+class Vector3(Vector):
+    """
+    Vector with exactly 3 entries and unrolled arithmetic.
+
+    Interchangeable with a size 3 Vector, results stay Vector3 where possible.
+    """
+    __slots__ = ()
+
+    def __init__(self, values):
+        self._value = values
+        self.size = 3
+        self._length = None
+
+    def __add__(self, other):
+        if type(other) is int and other == 0:  # from sum()
+            return self
+        a0, a1, a2 = self._value
+        try:
+            b0, b1, b2 = other._value
+        except AttributeError:  # no adding scalars
+            return NotImplemented
+        return Vector3((a0+b0, a1+b1, a2+b2))
+
+    def __sub__(self, other):
+        a0, a1, a2 = self._value
+        b0, b1, b2 = other._value
+        return Vector3((a0-b0, a1-b1, a2-b2))
+
+    def __neg__(self):
+        a0, a1, a2 = self._value
+        return Vector3((-a0, -a1, -a2))
+
+    def __mul__(self, a):
+        b0, b1, b2 = self._value
+        return Vector3((a*b0, a*b1, a*b2))
+
+    def __matmul__(self, other):  # v@v
+        a0, a1, a2 = self._value
+        b0, b1, b2 = other._value
+        return a0*b0 + a1*b1 + a2*b2
+
+    def __rmatmul__(self, other):  # m@v, only reached with generic matrices
+        if other._IS_VECTOR:  # python asks subclasses first, even for v@v
+            return self @ other
+        if other.size != (3, 3):
+            return Vector.__rmatmul__(self, other)
+        (a0, a1, a2), (b0, b1, b2), (c0, c1, c2) = other._value
+        x, y, z = self._value
+        return Vector3((
+            a0*x + a1*y + a2*z,
+            b0*x + b1*y + b2*z,
+            c0*x + c1*y + c2*z,
+        ))
+
+    def cross(self, other):
+        """
+        Cross Product.
+        :param other: Vector
+        :return: self⨯other
+        """
+        a1, a2, a3 = self._value
+        b1, b2, b3 = other._value
+        return Vector3((
+            a2*b3 - a3*b2,
+            a3*b1 - a1*b3,
+            a1*b2 - a2*b1,
+        ))
+
+
+class Matrix3(Matrix):
+    """
+    3x3 Matrix with unrolled arithmetic.
+
+    Interchangeable with a 3x3 Matrix, results stay Matrix3/Vector3 where possible.
+
+    inverse(self) returns the inverse matrix.
+    """
+    __slots__ = ()
+
+    def __init__(self, rows, det=None):
+        self._value = rows
+        self.size = (3, 3)
+        self.is_square = True
+        self._det = det
+        self._lu = None
+        self._hash = None
+
+    def __add__(self, other):
+        if type(other) is int and other == 0:  # from sum()
+            return self
+        (a0, a1, a2), (b0, b1, b2), (c0, c1, c2) = self._value
+        try:
+            (d0, d1, d2), (e0, e1, e2), (f0, f1, f2) = other._value
+        except AttributeError:  # no adding scalars
+            return NotImplemented
+        return Matrix3((
+            (a0+d0, a1+d1, a2+d2),
+            (b0+e0, b1+e1, b2+e2),
+            (c0+f0, c1+f1, c2+f2),
+        ))
+
+    def __mul__(self, s):
+        """Scalar multiplication."""
+        (a0, a1, a2), (b0, b1, b2), (c0, c1, c2) = self._value
+        if (det := self._det) is not None:
+            det *= s**3
+        return Matrix3((
+            (s*a0, s*a1, s*a2),
+            (s*b0, s*b1, s*b2),
+            (s*c0, s*c1, s*c2),
+        ), det)
+
+    def __matmul__(self, other):
+        (a0, a1, a2), (b0, b1, b2), (c0, c1, c2) = self._value
+        if other._IS_VECTOR and other.size == 3:  # m@v
+            x, y, z = other._value
+            return Vector3((
+                a0*x + a1*y + a2*z,
+                b0*x + b1*y + b2*z,
+                c0*x + c1*y + c2*z,
+            ))
+        if not other._IS_MATRIX or other.size != (3, 3):
+            return Matrix.__matmul__(self, other)
+
+        (d0, d1, d2), (e0, e1, e2), (f0, f1, f2) = other._value
+        if (det := self._det) is not None and (o_det := other._det) is not None:
+            det *= o_det
+        return Matrix3((
+            (a0*d0 + a1*e0 + a2*f0, a0*d1 + a1*e1 + a2*f1, a0*d2 + a1*e2 + a2*f2),
+            (b0*d0 + b1*e0 + b2*f0, b0*d1 + b1*e1 + b2*f1, b0*d2 + b1*e2 + b2*f2),
+            (c0*d0 + c1*e0 + c2*f0, c0*d1 + c1*e1 + c2*f1, c0*d2 + c1*e2 + c2*f2),
+        ), det)
+
+    def transpose(self):
+        return Matrix3(tuple(zip(*self._value)), self._det)
+
+    @property
+    def inverse(self):
+        """
+        Inverse by the adjugate, raises ZeroDivisionError if singular.
+        :return: Matrix3
+        """
+        (a, b, c), (d, e, f), (g, h, i) = self._value
+        det = self.det
+        return Matrix3((
+            ((e*i - f*h) / det, (c*h - b*i) / det, (b*f - c*e) / det),
+            ((f*g - d*i) / det, (a*i - c*g) / det, (c*d - a*f) / det),
+            ((d*h - e*g) / det, (b*g - a*h) / det, (a*e - b*d) / det),
+        ), 1 / det)
+
+
+class Matrix4(Matrix):
+    """
+    4x4 Matrix for homogeneous transforms of 3D points.
+
+    A point (x, y, z) is taken as (x, y, z, 1), so translation, rotation,
+    scaling and perspective all compose with @ into one matrix.
+    m @ Vector3 transforms a point and divides by w, m @ Vector with
+    4 entries is the plain product.
+
+    affine(m, offset) builds the transform p -> m @ p + offset.
+    is_affine(self) is True if the bottom row is (0, 0, 0, 1).
+    linear(self) returns the top left 3x3 part as a Matrix3.
+    translation(self) returns the last column as a Vector3.
+    inverse(self) returns the inverse, cheap for affine transforms.
+    """
+    __slots__ = ()
+
+    def __init__(self, rows, det=None):
+        self._value = rows
+        self.size = (4, 4)
+        self.is_square = True
+        self._det = det
+        self._lu = None
+        self._hash = None
+
+    @staticmethod
+    def affine(m, offset):
+        """
+        :param m: Matrix3, linear part
+        :param offset: Vector3, translation
+        :return: Matrix4
+        """
+        (a0, a1, a2), (b0, b1, b2), (c0, c1, c2) = m._value
+        x, y, z = offset._value
+        return Matrix4((
+            (a0, a1, a2, x),
+            (b0, b1, b2, y),
+            (c0, c1, c2, z),
+            (0, 0, 0, 1),
+        ), m._det)
+
+    @property
+    def is_affine(self):
+        return self._value[3] == (0, 0, 0, 1)
+
+    @property
+    def linear(self):
+        v = self._value
+        return Matrix3((v[0][:3], v[1][:3], v[2][:3]), self._det if self.is_affine else None)
+
+    @property
+    def translation(self):
+        v = self._value
+        return Vector3((v[0][3], v[1][3], v[2][3]))
+
+    def __mul__(self, s):
+        """Scalar multiplication."""
+        if (det := self._det) is not None:
+            det *= s**4
+        return Matrix4(tuple(tuple(s*x for x in row) for row in self._value), det)
+
+    def __matmul__(self, other):
+        (a0, a1, a2, a3), (b0, b1, b2, b3), (c0, c1, c2, c3), (d0, d1, d2, d3) = self._value
+        if other._IS_VECTOR and other.size == 3:  # point, with w = 1
+            x, y, z = other._value
+            w = d0*x + d1*y + d2*z + d3
+            return Vector3((
+                (a0*x + a1*y + a2*z + a3) / w,
+                (b0*x + b1*y + b2*z + b3) / w,
+                (c0*x + c1*y + c2*z + c3) / w,
+            ))
+        if not other._IS_MATRIX or other.size != (4, 4):
+            return Matrix.__matmul__(self, other)
+
+        (e0, e1, e2, e3), (f0, f1, f2, f3), (g0, g1, g2, g3), (h0, h1, h2, h3) = other._value
+        if (det := self._det) is not None and (o_det := other._det) is not None:
+            det *= o_det
+        return Matrix4((
+            (a0*e0 + a1*f0 + a2*g0 + a3*h0, a0*e1 + a1*f1 + a2*g1 + a3*h1,
+             a0*e2 + a1*f2 + a2*g2 + a3*h2, a0*e3 + a1*f3 + a2*g3 + a3*h3),
+            (b0*e0 + b1*f0 + b2*g0 + b3*h0, b0*e1 + b1*f1 + b2*g1 + b3*h1,
+             b0*e2 + b1*f2 + b2*g2 + b3*h2, b0*e3 + b1*f3 + b2*g3 + b3*h3),
+            (c0*e0 + c1*f0 + c2*g0 + c3*h0, c0*e1 + c1*f1 + c2*g1 + c3*h1,
+             c0*e2 + c1*f2 + c2*g2 + c3*h2, c0*e3 + c1*f3 + c2*g3 + c3*h3),
+            (d0*e0 + d1*f0 + d2*g0 + d3*h0, d0*e1 + d1*f1 + d2*g1 + d3*h1,
+             d0*e2 + d1*f2 + d2*g2 + d3*h2, d0*e3 + d1*f3 + d2*g3 + d3*h3),
+        ), det)
+
+    def transpose(self):
+        return Matrix4(tuple(zip(*self._value)), self._det)
+
+    @property
+    def inverse(self):
+        """
+        Inverse, raises ZeroDivisionError if singular.
+        Affine transforms only need the inverse of their 3x3 part.
+        :return: Matrix4
+        """
+        if not self.is_affine:
+            return Matrix.inverse.fget(self)
+        m = self.linear.inverse
+        return Matrix4.affine(m, -(m @ self.translation))
@@ -0,0 +1,180 @@
+from array import array
+
+from spinny import backend
+from spinny.matrix import Vector as V
+
+
+class Mesh:
+    """
+    Compact structure-of-arrays storage for vertices and faces.
+
+    Everything lives in flat typed arrays, so a mesh costs a handful of
+    objects no matter how many vertices and faces it has.
+
+    build(points, faces) creates a Mesh from tuples.
+    extend(self, other) appends another mesh's vertices and faces.
+    move_by(self, pos) moves every vertex and face centre in place.
+    transform(self, m) transforms vertices, centres and directions in place.
+    point(self, i) returns vertex i as a Vector.
+    face_points(self, f) returns vertex indices of face f.
+    face_coords(self, f) returns (x, y, z) of face f's vertices.
+    tri_iter(self, f) returns generator of face f's triangles.
+    triangles(self) returns every face fanned into triangles (memoised).
+
+    coords: array('d'), x, y, z of each vertex.
+    index: array('i'), vertex indices of all faces, back to back.
+    offsets: array('i'), face f uses index[offsets[f]:offsets[f+1]].
+    normals: array('d'), x, y, z of each face direction.
+    centres: array('d'), x, y, z of each face centre.
+    colour_ids: array('i'), palette position of each face's colour.
+    palette: list of Colours used by the faces.
+    version: int, bumped whenever face directions change.
+    """
+    __slots__ = (
+        'coords', 'index', 'offsets',
+        'normals', 'centres', 'colour_ids', 'palette', 'version',
+        '_triangles',
+    )
+
+    def __init__(self):
+        self.coords = array('d')
+        self.index = array('i')
+        self.offsets = array('i', (0,))
+        self.normals = array('d')
+        self.centres = array('d')
+        self.colour_ids = array('i')
+        self.palette = []
+        self.version = 0
+        self._triangles = None
+
+    @classmethod
+    def build(cls, points, faces):
+        """
+        Create Mesh from vertex and face tuples.
+        :param points: iterable of (x, y, z)
+        :param faces: iterable of (direction, Colour, vertex indices)
+        :return: Mesh
+        """
+        mesh = cls()
+        for p in points:
+            mesh.coords.extend(p)
+        for direction, colour, indices in faces:
+            mesh.add_face(direction, colour, indices)
+        return mesh
+
+    @property
+    def vertex_count(self):
+        return len(self.coords) // 3
+
+    @property
+    def face_count(self):
+        return len(self.colour_ids)
+
+    def colour_id(self, colour):
+        """
+        Find colour in the palette, adding it if needed.
+        :param colour: Colour
+        :return: int, palette position
+        """
+        for i, c in enumerate(self.palette):  # palettes are tiny
+            if c.rgb == colour.rgb:
+                return i
+        self.palette.append(colour)
+        return len(self.palette) - 1
+
+    def add_face(self, direction, colour, points):
+        """
+        Append a face, computing its centre from the current vertices.
+        :param direction: (x, y, z), face direction
+        :param colour: Colour
+        :param points: vertex indices
+        """
+        c = self.coords
+        n = len(points)
+        self.index.extend(points)
+        self.offsets.append(len(self.index))
+        self.normals.extend(direction)
+        self.centres.extend((
+            sum(c[3*p] for p in points) / n,
+            sum(c[3*p+1] for p in points) / n,
+            sum(c[3*p+2] for p in points) / n,
+        ))
+        self.colour_ids.append(self.colour_id(colour))
+
+    def extend(self, other):
+        """
+        Append another mesh, offsetting its indices and merging palettes.
+        :param other: Mesh
+        """
+        offset = self.vertex_count
+        start = len(self.index)
+        self.coords.extend(other.coords)
+        self.index.extend(p + offset for p in other.index)
+        self.offsets.extend(o + start for o in other.offsets[1:])
+        self.normals.extend(other.normals)
+        self.centres.extend(other.centres)
+        ids = [self.colour_id(c) for c in other.palette]
+        self.colour_ids.extend(ids[i] for i in other.colour_ids)
+
+    def point(self, i):
+        return V(tuple(self.coords[3*i:3*i+3]))
+
+    def face_points(self, f):
+        return tuple(self.index[self.offsets[f]:self.offsets[f+1]])
+
+    def face_coords(self, f):
+        c = self.coords
+        return [(c[3*p], c[3*p+1], c[3*p+2]) for p in self.index[self.offsets[f]:self.offsets[f+1]]]
+
+    def face_direction(self, f):
+        return V(tuple(self.normals[3*f:3*f+3]))
+
+    def face_centre(self, f):
+        return V(tuple(self.centres[3*f:3*f+3]))
+
+    def face_colour(self, f):
+        return self.palette[self.colour_ids[f]]
+
+    @property
+    def triangles(self):
+        """
+        Every face fanned into triangles, worked out once and kept until
+        faces are added (faces are only ever appended to a Mesh).
+        :return: (tris, starts), tris array('i') with 3 vertex indices per
+            triangle, starts array('i') where face f has triangles
+            starts[f] to starts[f+1]
+        """
+        res = self._triangles
+        if res is None or res[0] != len(self.index):
+            res = self._triangles = (len(self.index), *backend.triangulate(self.index, self.offsets))
+        return res[1], res[2]
+
+    def tri_iter(self, f):
+        """Returns generator of face f's triangles."""
+        tris, starts = self.triangles
+        return (tuple(tris[t:t+3]) for t in range(3*starts[f], 3*starts[f+1], 3))
+
+    def move_by(self, pos):
+        """
+        Move vertices and face centres by an offset, in place.
+        :param pos: Vector
+        """
+        backend.move_by(self.coords, pos)
+        backend.move_by(self.centres, pos)
+
+    def transform(self, m):
+        """
+        Preform linear matrix transformation on the mesh, in place.
+        An affine 4x4 Matrix moves the mesh in the same pass.
+        :param m: Matrix, 3x3 or affine 4x4
+        """
+        if m.size == (4, 4):
+            if not m.is_affine:
+                raise ValueError('Mesh transforms have to be affine')
+            linear = m.linear
+        else:
+            linear = m
+        backend.transform(self.coords, m)
+        backend.transform(self.centres, m)
+        backend.transform(self.normals, linear)
+        self.version += 1
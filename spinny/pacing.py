@@ -0,0 +1,135 @@
+"""
+Frame pacing and quality scaling.
+
+FramePacer decides when the next frame starts, so frames come at a steady
+rate instead of a fixed pause after however long the last one took.
+QualityGovernor lowers the detail when frames keep missing that rate and
+raises it again once there is room.
+"""
+from collections import deque
+from time import perf_counter
+
+
+class FramePacer:
+    """
+    Schedules frames at a target rate and measures the rate really reached.
+
+    Frames are given slots budget ms apart. A frame that runs a little into
+    the next slot is followed right away (delayed), one that runs far into
+    it gives up the missed slots (dropped) so the rhythm stays even.
+
+    begin(self) marks the start of a frame.
+    delay(self) returns ms to wait before starting the next frame.
+
+    budget: float, ms per frame at the target rate.
+    fps: float, frames started per second, over the last second.
+    dropped: int, slots skipped because frames ran over.
+    clock: function returning seconds (perf_counter).
+    """
+    def __init__(self, target_fps=30, clock=perf_counter):
+        self.budget = 1000 / target_fps
+        self.dropped = 0
+        self.clock = clock
+        self._starts = deque()  # start times of recent frames, in ms
+        self._slot = None  # when the current frame was due
+
+    def begin(self):
+        now = self.clock() * 1000
+        starts = self._starts
+        starts.append(now)
+        while now - starts[0] > 1000:
+            starts.popleft()
+        if self._slot is None or now - self._slot > 2*self.budget:
+            self._slot = now  # first frame, or back from a pause
+        else:
+            self._slot = max(self._slot, now - self.budget)
+
+    def delay(self):
+        """
+        Work out when the next frame is due.
+        :return: int, ms to wait, at least 1 so tk gets to handle input
+        """
+        now = self.clock() * 1000
+        budget = self.budget
+        self._slot += budget
+        late = now - self._slot
+        if late > budget / 2:  # way over, skip the slots that were missed
+            missed = int(late // budget) + 1
+            self.dropped += missed
+            self._slot += missed * budget
+        elif late > 0:
+            self._slot = now  # a little over, go again straight away
+        return max(1, round(self._slot - now))
+
+    @property
+    def fps(self):
+        starts = self._starts
+        if len(starts) < 2:
+            return 0.0
+        return (len(starts) - 1) * 1000 / (starts[-1] - starts[0])
+
+
+class QualityGovernor:
+    """
+    Steps detail down when frames keep running over budget, and back up
+    when they have been comfortably under it for a while. Going down is
+    quick and going up slow, so the level doesn't flip every frame.
+
+    update(self, frame_ms) feeds in a frame's cost.
+
+    levels: tuple of (min_area, shade_levels), full quality first.
+        min_area: float, triangles smaller than this many pixels are skipped.
+        shade_levels: int, shades per colour (see colour.ShadeCache).
+    level: int, position of the current settings in levels.
+    quality: (min_area, shade_levels) of the current level.
+    budget: float, ms a frame may take.
+    """
+    LEVELS = (
+        (0, 256),
+        (2, 64),
+        (6, 24),
+        (16, 8),
+    )
+
+    def __init__(self, budget, levels=LEVELS, down_after=3, up_after=30, headroom=0.6):
+        """
+        :param budget: float, ms per frame
+        :param levels: tuple of (min_area, shade_levels), full quality first
+        :param down_after: int, frames over budget in a row before stepping down
+        :param up_after: int, frames under headroom*budget in a row before stepping up
+        :param headroom: float, fraction of the budget that counts as comfortable
+        """
+        self.budget = budget
+        self.levels = levels
+        self.level = 0
+        self.down_after = down_after
+        self.up_after = up_after
+        self.headroom = headroom
+        self._over = 0
+        self._under = 0
+
+    @property
+    def quality(self):
+        return self.levels[self.level]
+
+    def update(self, frame_ms):
+        """
+        :param frame_ms: float, how long the last frame took
+        :return: (min_area, shade_levels) to use from now on
+        """
+        if frame_ms > self.budget:
+            self._over += 1
+            self._under = 0
+        elif frame_ms < self.budget * self.headroom:
+            self._under += 1
+            self._over = 0
+        else:
+            self._over = self._under = 0
+
+        if self._over >= self.down_after and self.level+1 < len(self.levels):
+            self.level += 1
+            self._over = 0
+        elif self._under >= self.up_after and self.level > 0:
+            self.level -= 1
+            self._under = 0
+        return self.quality
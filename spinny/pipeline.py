@@ -0,0 +1,101 @@
+"""
+Scene work on a background thread, so the tk thread only has to paint.
+
+The tk thread hands a snapshot of what the next frame needs to the worker
+and paints whatever display list the worker finished last. While tk
+paints frame N (the front list) the worker builds frame N+1 (the back
+list), then the two swap.
+"""
+import threading
+from collections import deque
+
+from spinny.timing import FrameTimer
+
+
+class DisplayList:
+    """
+    One frame's drawing, made without touching tk.
+
+    raster: bool, made for the software rasteriser rather than tk polygons.
+    items: list of (coords, fill) polygons, bottom first, or for the
+        rasteriser (a, b, c, rgb) triangles, front first.
+    """
+    __slots__ = ('raster', 'items')
+
+    def __init__(self, raster, items):
+        self.raster = raster
+        self.items = items
+
+
+class ScenePipeline:
+    """
+    Runs a frame building function on a worker thread.
+
+    Both handoffs are single slot deques. Appending to and popping from a
+    deque are atomic, so neither thread ever waits on a lock, and a newer
+    snapshot (or display list) simply replaces one nobody picked up.
+
+    submit(self, snapshot) asks for a frame, replacing one not started yet.
+    take(self) returns the newest finished DisplayList, or None.
+    close(self) stops the worker.
+
+    build: function (snapshot, timer) -> DisplayList, run on the worker.
+    timer: FrameTimer of the worker's stages.
+    error: exception the worker stopped with, raised again by take.
+    """
+    STAGES = ('projection', 'culling', 'sort', 'shading', 'emit')
+
+    def __init__(self, build):
+        self.build = build
+        self.timer = FrameTimer(self.STAGES)
+        self.error = None
+        self._requests = deque(maxlen=1)
+        self._results = deque(maxlen=1)
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='spinny-scene', daemon=True)
+        self._thread.start()
+
+    def submit(self, snapshot):
+        """
+        Ask the worker for a frame.
+        :param snapshot: whatever build needs, must not change afterwards
+        """
+        self._requests.append(snapshot)
+        self._wake.set()
+
+    def take(self):
+        """
+        :return: DisplayList, newest finished frame (None if there isn't a new one)
+        """
+        if self.error is not None:
+            raise self.error
+        try:
+            return self._results.popleft()
+        except IndexError:
+            return None
+
+    def close(self):
+        self._requests.append(None)
+        self._wake.set()
+        self._thread.join(timeout=1)
+
+    def _run(self):
+        timer = self.timer
+        while True:
+            self._wake.wait()
+            self._wake.clear()  # a submit after this wakes the next wait
+            while True:
+                try:
+                    snapshot = self._requests.popleft()
+                except IndexError:
+                    break
+                if snapshot is None:  # closed
+                    return
+                timer.begin()
+                try:
+                    frame = self.build(snapshot, timer)
+                except Exception as e:  # hand it over, a dead worker would just freeze the picture
+                    self.error = e
+                    return
+                timer.end()
+                self._results.append(frame)
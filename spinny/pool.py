@@ -0,0 +1,72 @@
+class PolygonPool:
+    """
+    Reuses tk canvas polygons between frames instead of recreating them.
+
+    Items are handed out in creation order, so the n-th polygon drawn in a
+    frame is always the n-th lowest on the canvas and the painter's
+    algorithm keeps working without restacking anything.
+
+    begin(self) starts a new frame.
+    draw(self, coords, fill) shows the next polygon.
+    end(self) hides whatever was left over from the last frame.
+
+    canvas: tk Canvas object.
+    tag: str, tag of every pooled item.
+    items: list of canvas item ids, bottom to top.
+    fills: list of current fill of each item.
+    used: int, items drawn so far this frame.
+    shown: int, items visible on the canvas.
+    grown: bool, whether items were created this frame.
+    """
+    def __init__(self, canvas, tag='pooled'):
+        self.canvas = canvas
+        self.tag = tag
+        self.items = []
+        self.fills = []
+        self.used = 0
+        self.shown = 0
+        self.grown = False
+
+    def begin(self):
+        self.used = 0
+        self.grown = False
+
+    def draw(self, coords, fill):
+        """
+        Show polygon, reusing a pooled item if there is one.
+        :param coords: iterable of (x, y) points
+        :param fill: str, hex colour
+        """
+        i = self.used
+        self.used += 1
+        if i == len(self.items):  # pool too small, grow it
+            self.items.append(self.canvas.create_polygon(
+                *coords,
+                fill=fill,
+                tag=self.tag,
+            ))
+            self.fills.append(fill)
+            self.grown = True
+            return
+
+        item = self.items[i]
+        self.canvas.coords(item, *coords)
+        if i >= self.shown:
+            self.canvas.itemconfig(item, fill=fill, state='normal')
+            self.fills[i] = fill
+        elif self.fills[i] != fill:
+            self.canvas.itemconfig(item, fill=fill)
+            self.fills[i] = fill
+
+    def end(self):
+        """Hides unused items. New items go below everything else."""
+        for item in self.items[self.used:self.shown]:
+            self.canvas.itemconfig(item, state='hidden')
+        self.shown = self.used
+        if self.grown:
+            self.canvas.tag_lower(self.tag)  # keeps their relative order
+
+    def clear(self):
+        """Hides every item."""
+        self.begin()
+        self.end()
@@ -0,0 +1,221 @@
+"""
+Profiling a running Spinny, see Spinny.profile and `python3 -m spinny --profile`.
+
+Writes up to three files next to each other:
+    <path>.pstats: cProfile stats of the tk thread, for pstats or snakeviz.
+    <path>.collapsed: sampled call stacks, one `a;b;c count` line each,
+        for flamegraph.pl or speedscope.
+    <path>.alloc.jsonl: with allocations on, one line per frame of
+        created: objects made by each function (e.g. Matrix.__matmul__
+            making Vector3s), temporaries included, most first.
+        retained: memory blocks each line still held at the end of the frame.
+        peak_kib: how far above its starting point the frame's memory peaked.
+
+Objects are counted by a sys.settrace call hook on Python __init__s, so
+ints, floats and tuples made inside those functions aren't counted on
+their own. tracemalloc only knows blocks that are still allocated, which
+is why it is used for what a frame retains and its peak, not for counts.
+"""
+import cProfile
+import json
+import sys
+import threading
+import tracemalloc
+from bisect import bisect_right
+from collections import Counter
+
+
+class Profiler:
+    """
+    cProfile, a stack sampler and optionally allocation tracking around a run of frames.
+
+    start(self) starts profiling the calling thread.
+    begin_frame(self) and end_frame(self) mark out a frame.
+    stop(self) stops everything and writes the files (only once).
+
+    path: str, file names start with this.
+    frames: int, frames to profile, or None for no limit.
+    allocations: bool, count objects made and take a tracemalloc snapshot every frame.
+    interval: float, seconds between stack samples.
+    top: int, sites kept per frame in the allocation report.
+    counter: int, frames ended so far.
+    created: Counter of (function, class) -> objects made, over all frames.
+    retained: Counter of line -> blocks left allocated, over all frames.
+    """
+    DEPTH = 12  # traceback frames kept, enough to spot this module under an allocation
+
+    def __init__(self, path='spinny_profile', frames=None, allocations=False, interval=0.005, top=10):
+        self.path = path
+        self.frames = frames
+        self.allocations = allocations
+        self.interval = interval
+        self.top = top
+        self.counter = 0
+        self.created = Counter()
+        self.retained = Counter()
+        self._profile = cProfile.Profile()
+        self._stacks = Counter()
+        self._sampler = None
+        self._done = threading.Event()
+        self._made = Counter()  # (code object, class name) -> objects, this frame
+        self._snapshot = None  # end of the previous frame
+        self._base = 0  # bytes traced when the frame began
+        self._functions = None  # file name -> (first lines, code objects), from cProfile
+        self._alloc_fp = None
+        self._running = False
+        self._paused = False  # in a snapshot, the sampler looks away
+
+    def start(self):
+        if self.allocations:
+            tracemalloc.start(self.DEPTH)
+            self._snapshot = self._take_snapshot()
+            self._alloc_fp = open(self.path + '.alloc.jsonl', 'w')
+            sys.settrace(self._trace)
+        self._sampler = threading.Thread(
+            target=self._sample, args=(threading.get_ident(),), name='spinny-sampler', daemon=True,
+        )
+        self._sampler.start()
+        self._running = True
+        self._profile.enable()
+
+    def begin_frame(self):
+        if self.allocations:
+            if hasattr(tracemalloc, 'reset_peak'):  # 3.9+, else the peak is since start
+                tracemalloc.reset_peak()
+            self._base = tracemalloc.get_traced_memory()[0]
+
+    def end_frame(self):
+        """
+        :return: bool, whether the frames asked for are done
+        """
+        if not self._running:
+            return False
+        if self.allocations:
+            sys.settrace(None)  # keep the report's own work out of everything
+            self._profile.disable()
+            self._paused = True
+            self._record_allocations()
+            self._paused = False
+            self._profile.enable()
+            sys.settrace(self._trace)
+        self.counter += 1
+        return self.frames is not None and self.counter >= self.frames
+
+    def stop(self):
+        if not self._running:
+            return
+        self._running = False
+        self._profile.disable()
+        self._done.set()
+        self._sampler.join()
+        if self.allocations:
+            sys.settrace(None)
+            tracemalloc.stop()
+            self._alloc_fp.close()
+        self.save()
+
+    def save(self):
+        """Write stats and stacks, and print where they went."""
+        self._profile.dump_stats(self.path + '.pstats')
+        with open(self.path + '.collapsed', 'w') as fp:
+            for stack, count in self._stacks.most_common():
+                fp.write('{} {}\n'.format(stack, count))
+        written = [self.path + '.pstats', self.path + '.collapsed']
+        if self.allocations:
+            written.append(self.path + '.alloc.jsonl')
+        print('profiled {} frames, wrote {}'.format(self.counter, ', '.join(written)))
+        if self.created and self.counter:
+            print('objects created per frame:')
+            for (site, cls), count in self.created.most_common(self.top):
+                print('{:10.1f}  {} {}'.format(count / self.counter, cls, site))
+
+    def _trace(self, frame, event, arg):
+        """sys.settrace hook, counts objects made by Python __init__s by the function making them."""
+        if event == 'call' and frame.f_code.co_name == '__init__':
+            caller = frame.f_back
+            if caller is not None:
+                obj = frame.f_locals.get('self')
+                # super().__init__ is the same object again
+                if caller.f_code.co_name != '__init__' or caller.f_locals.get('self') is not obj:
+                    self._made[caller.f_code, type(obj).__name__] += 1
+        return None  # no line events
+
+    def _take_snapshot(self):
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__, all_frames=True),  # the sampler, the report
+        ))
+
+    def _record_allocations(self):
+        _, peak = tracemalloc.get_traced_memory()
+        made = [(_name(code), cls, count) for (code, cls), count in self._made.most_common()]
+        self._made.clear()
+        for site, cls, count in made:
+            self.created[site, cls] += count
+
+        snapshot = self._take_snapshot()
+        diff = snapshot.compare_to(self._snapshot, 'lineno')
+        self._snapshot = snapshot
+        self._functions = None  # functions called since, looked up again if needed
+        grown = [d for d in diff if d.count_diff > 0]
+        grown.sort(key=lambda d: d.count_diff, reverse=True)
+        retained = [(self._site(d.traceback[0]), d.count_diff, d.size_diff) for d in grown]
+        for site, count, _ in retained:
+            self.retained[site] += count
+
+        record = {
+            'frame': self.counter,
+            'created': sum(count for _, _, count in made),
+            'peak_kib': round((peak - self._base) / 1024, 1),
+            'retained_blocks': sum(d.count_diff for d in diff),
+            'retained_kib': round(sum(d.size_diff for d in diff) / 1024, 1),
+            'sites': [list(s) for s in made[:self.top]],
+            'retained': [list(s) for s in retained[:self.top]],
+        }
+        self._alloc_fp.write(json.dumps(record) + '\n')
+
+    def _site(self, frame):
+        """
+        Name a tracemalloc frame like `matrix.py:Matrix.__matmul__:140`,
+        by the function cProfile saw starting closest above that line.
+        :param frame: tracemalloc.Frame
+        :return: str
+        """
+        if self._functions is None:
+            functions = {}
+            for entry in self._profile.getstats():
+                code = entry.code
+                if not isinstance(code, str):  # str for builtins
+                    functions.setdefault(code.co_filename, []).append((code.co_firstlineno, code))
+            for file, found in functions.items():
+                found.sort(key=lambda f: f[0])
+                functions[file] = ([line for line, _ in found], [code for _, code in found])
+            self._functions = functions
+        lines, codes = self._functions.get(frame.filename, ((), ()))
+        i = bisect_right(lines, frame.lineno) - 1
+        if i < 0:
+            return '{}:<module>:{}'.format(_short(frame.filename), frame.lineno)
+        return '{}:{}'.format(_name(codes[i]), frame.lineno)
+
+    def _sample(self, ident):
+        """Count the profiled thread's call stacks until stopped. Runs on its own thread."""
+        stacks = self._stacks
+        while not self._done.wait(self.interval):
+            if self._paused:
+                continue
+            frame = sys._current_frames().get(ident)
+            names = []
+            while frame is not None:
+                names.append(_name(frame.f_code))
+                frame = frame.f_back
+            if names:
+                stacks[';'.join(reversed(names))] += 1
+
+
+def _short(filename):
+    return filename.replace('\\', '/').rsplit('/', 1)[-1]
+
+
+def _name(code):
+    """Name a function like `matrix.py:Matrix.__matmul__`."""
+    return '{}:{}'.format(_short(code.co_filename), getattr(code, 'co_qualname', code.co_name))
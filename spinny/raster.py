@@ -0,0 +1,131 @@
+from array import array
+from functools import lru_cache
+from math import ceil
+
+
+class FrameBuffer:
+    """
+    RGB framebuffer with a depth buffer and a scanline triangle rasteriser.
+
+    Depth is stored as inverse depth (1/distance), which interpolates
+    linearly across the screen. Bigger is closer, 0 is infinitely far.
+
+    clear(self, box) resets colour to the background and depth to far away.
+    triangle(self, a, b, c, rgb, box) rasterises a triangle with depth testing.
+    ppm(self) returns the frame as binary PPM bytes (tk can show those).
+    save_ppm(self, path) writes the frame to a PPM file.
+
+    width, height: ints, size in pixels.
+    colour: bytearray, r, g, b of each pixel, rows top to bottom.
+    depth: array('d'), inverse depth of each pixel.
+    background: bytes, r, g, b of empty pixels.
+
+    Both buffers can be supplied instead (e.g. views of shared memory) as
+    long as they support slice assignment, like a memoryview cast to 'd'.
+    Supplied buffers are left as they are, clear them if they need it.
+    """
+    def __init__(self, width, height, background=b'\x00\x00\x00', buffers=None):
+        self.width = width
+        self.height = height
+        self.background = bytes(background)
+        if buffers is None:
+            buffers = (
+                bytearray(width*height*3),
+                array('d', bytes(8 * width*height)),
+            )
+            self.colour, self.depth = buffers
+            self.clear()
+        else:  # others may be drawing in them already
+            self.colour, self.depth = buffers
+
+    def clear(self, box=None):
+        """
+        Reset pixels to background colour and infinite depth.
+        :param box: (left, top, right, bottom) to clear, default everything
+        """
+        if box is None:
+            box = (0, 0, self.width, self.height)
+        left, top, right, bottom = box
+        if left == 0 and right == self.width:  # whole rows, one slice will do
+            left, right = top*self.width, bottom*self.width
+            top, bottom = 0, 1
+        n = right - left
+        blank_colour = self.background * n
+        blank_depth = array('d', bytes(8*n))
+        for y in range(top, bottom):
+            i = y*self.width + left
+            self.colour[3*i:3*(i+n)] = blank_colour
+            self.depth[i:i+n] = blank_depth
+
+    def triangle(self, a, b, c, rgb, box=None):
+        """
+        Rasterise a triangle, keeping pixels nearer than what's there.
+        :param a, b, c: (x, y, inverse depth) of each corner, in pixels
+        :param rgb: bytes of length 3
+        :param box: (left, top, right, bottom) to stay in, default everything
+        """
+        (x0, y0, w0), (x1, y1, w1), (x2, y2, w2) = sorted((a, b, c), key=_y)
+        if y2 - y0 < 1e-9:
+            return
+        if w0 <= 0 or w1 <= 0 or w2 <= 0:  # unprojected corner, only from callers that skip near clipping
+            return
+        width = self.width
+        colour = self.colour
+        depth = self.depth
+        if box is None:
+            box = (0, 0, width, self.height)
+        box_left, box_top, box_right, box_bottom = box
+
+        top = max(ceil(y0 - 0.5), box_top)  # pixel centres inside [y0, y2)
+        bottom = min(ceil(y2 - 0.5), box_bottom)
+        long_dx = (x2-x0) / (y2-y0)
+        long_dw = (w2-w0) / (y2-y0)
+        for y in range(top, bottom):
+            py = y + 0.5
+            xl = x0 + (py-y0)*long_dx
+            wl = w0 + (py-y0)*long_dw
+            if py < y1:  # upper half, short edge is a-b
+                t = (py-y0) / (y1-y0)
+                xr = x0 + (x1-x0)*t
+                wr = w0 + (w1-w0)*t
+            else:  # lower half, short edge is b-c
+                t = (py-y1) / (y2-y1) if y2 > y1 else 1
+                xr = x1 + (x2-x1)*t
+                wr = w1 + (w2-w1)*t
+            if xl > xr:
+                xl, xr, wl, wr = xr, xl, wr, wl
+
+            left = max(ceil(xl - 0.5), box_left)
+            right = min(ceil(xr - 0.5), box_right)
+            if left >= right:
+                continue
+            dw = (wr-wl) / (xr-xl)
+            w = wl + (left + 0.5 - xl)*dw
+            i = y*width + left
+            for i in range(i, i + right-left):
+                if w > depth[i]:
+                    depth[i] = w
+                    colour[3*i:3*i+3] = rgb
+                w += dw
+
+    def ppm(self):
+        """Frame as binary PPM (P6)."""
+        return b'P6\n%d %d\n255\n' % (self.width, self.height) + bytes(self.colour)
+
+    def save_ppm(self, path):
+        with open(path, 'wb') as fp:
+            fp.write(self.ppm())
+
+
+def _y(corner):
+    return corner[1]
+
+
+@lru_cache(maxsize=None)  # fills repeat a lot
+def hex_to_bytes(hx):
+    """
+    Convert '#rrggbb' into 3 bytes.
+    :param hx: str
+    :return: bytes
+    """
+    return bytes.fromhex(hx[1:])
@@ -0,0 +1,184 @@
+"""
+Recording input and replaying it, so runs can be compared frame for frame.
+
+A recording is a small header followed by one fixed size record per frame:
+
+    header: magic, format version, time step (s), key names
+    record: dt, held keys, mouse dx, dy, camera position and angles
+
+Replays either put the camera exactly where the recording says (the same
+path whatever the build), or feed the recorded input back through
+Controls with the recorded time steps (to check changes to the controls).
+"""
+import struct
+
+from spinny.controls import Controls
+from spinny.matrix import Vector3
+from spinny.timing import percentiles
+
+
+MAGIC = b'SPNR'
+VERSION = 2  # 2: doubles, so re-run input lands exactly where it did
+# magic, version, key count, time step
+HEADER = struct.Struct('<4sHHf')
+# dt, held keys bit mask, mouse dx, dy, x, y, z, x angle, z angle
+RECORD = struct.Struct('<dHhh5d')
+
+
+def _clamp(n):
+    return max(-0x8000, min(0x7fff, n))
+
+
+class Recorder:
+    """
+    Writes one record per frame to a recording file.
+
+    record(self, dt, held, mx, my, camera) adds a frame.
+    close(self) finishes the file.
+
+    path: str, file being written.
+    keys: tuple of key names, in bit mask order.
+    frames: int, frames recorded so far.
+    """
+    def __init__(self, path, keys, step):
+        """
+        :param path: str
+        :param keys: iterable of key names (e.g. Spinny.KEY_BINDINGS)
+        :param step: float, seconds per frame the app aimed for
+        """
+        self.path = path
+        self.keys = tuple(keys)
+        self.frames = 0
+        self._bits = {key: 1 << i for i, key in enumerate(self.keys)}
+        self._fp = open(path, 'wb')
+        self._fp.write(HEADER.pack(MAGIC, VERSION, len(self.keys), step))
+        for key in self.keys:
+            name = key.encode()
+            self._fp.write(struct.pack('<B', len(name)) + name)
+
+    def record(self, dt, held, mx, my, camera):
+        """
+        :param dt: float, seconds the frame's input covers
+        :param held: set of key names held down
+        :param mx: int, mouse pixels moved right
+        :param my: int, mouse pixels moved down
+        :param camera: Camera, after the input was applied
+        """
+        mask = 0
+        for key in held:
+            mask |= self._bits.get(key, 0)
+        self._fp.write(RECORD.pack(
+            dt, mask, _clamp(mx), _clamp(my), *camera.pos._value, camera.x_angle, camera.z_angle,
+        ))
+        self.frames += 1
+
+    def close(self):
+        if not self._fp.closed:
+            self._fp.close()
+
+
+def load(path):
+    """
+    Read a recording.
+    :param path: str
+    :return: (key names tuple, time step, list of records)
+        record: (dt, held mask, mx, my, x, y, z, x_angle, z_angle)
+    """
+    with open(path, 'rb') as fp:
+        data = fp.read()
+    if len(data) < HEADER.size:
+        raise ValueError('{} is not a Spinny recording'.format(path))
+    magic, version, key_count, step = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('{} is not a version {} Spinny recording'.format(path, VERSION))
+    pos = HEADER.size
+    keys = []
+    for _ in range(key_count):
+        n = data[pos]
+        keys.append(data[pos+1:pos+1+n].decode())
+        pos += 1 + n
+    end = pos + (len(data)-pos) // RECORD.size * RECORD.size  # a cut off last record is dropped
+    return tuple(keys), step, list(RECORD.iter_unpack(data[pos:end]))
+
+
+class Replay(Controls):
+    """
+    Controls that play a recording back instead of listening to the user.
+
+    Live key and mouse events are ignored. Each apply plays the next
+    frame with the time it took when recorded, so a replay doesn't depend
+    on how long frames take now.
+
+    apply(self, camera, now) plays the next frame.
+    summary(self) returns frame time percentiles of the replay.
+
+    path: str, recording being played.
+    exact: bool, put the camera at the recorded poses rather than re-running input.
+    step: float, seconds per frame the recording aimed for.
+    records: list of records, see load.
+    frame: int, next record to play.
+    times: list of ms each played frame took, filled in by the app.
+    """
+    def __init__(self, path, bindings, exact=True):
+        """
+        :param path: str
+        :param bindings: dict of key name -> direction, as when recording
+        :param exact: bool, follow the recorded poses
+        """
+        keys, self.step, self.records = load(path)
+        super().__init__(bindings, max_step=float('inf'))  # recorded dts were already capped
+        self.path = path
+        self.keys = keys
+        self.exact = exact
+        self.frame = 0
+        self.times = []
+
+    @property
+    def done(self):
+        return self.frame >= len(self.records)
+
+    def press(self, key):
+        pass  # live input is ignored while replaying
+
+    def release(self, key):
+        pass
+
+    def look(self, dx, dy):
+        pass
+
+    def clear(self):
+        pass  # pausing mustn't change the time step
+
+    def apply(self, camera, now=None):
+        """
+        Play the next frame of the recording (nothing once it is done).
+        :param camera: Camera
+        :param now: ignored, replays keep their own time
+        :return: False, there is no pointer to re-centre
+        """
+        if self.done:
+            return False
+        dt, mask, mx, my, x, y, z, x_angle, z_angle = self.records[self.frame]
+        if self.exact or self.frame == 0:  # input is re-run from the first pose
+            camera.pos = Vector3((x, y, z))
+            camera.x_angle = x_angle
+            camera.z_angle = z_angle
+            camera.set_angle_update()
+        else:
+            self.held = {key for i, key in enumerate(self.keys) if mask >> i & 1 and key in self.bindings}
+            self.mouse = [mx, my]
+            self._last = 0.0  # so now - _last is the recorded dt exactly
+            super().apply(camera, now=dt)
+        self.frame += 1
+        return False
+
+    def summary(self):
+        """
+        :return: dict with the recording, frames played and frame_ms percentiles
+        """
+        return {
+            'replay': self.path,
+            'mode': 'poses' if self.exact else 'input',
+            'frames': len(self.times),
+            'frame_ms': percentiles(self.times) if self.times else None,
+        }
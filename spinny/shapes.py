@@ -1,107 +1,162 @@
-from spinny.matrix import Vector as V
+from array import array
+from math import floor
+
+from spinny.matrix import Vector as V, Matrix4
 from spinny.common import V3, M3
 from spinny.colour import Colour
+from spinny.mesh import Mesh
+from spinny.bvh import BVH
 
 
 class Face:
     """
-    Stores face's vertices as indices of parent object and centre, direction as vectors.
+    Lightweight view of one face of a Shape's Mesh.
+
+    Nothing is stored on the face itself, the properties read the mesh
+    buffers, so Faces can be created on demand and thrown away.
 
-    move_by(self, pos) allows moving the face centre's position.
-    transform(self, m) allows matrix transformation of the centre and direction.
     tri_iter(self) returns generator of face indices broken up into triangles.
 
     parent: Shape object.
-    direction: 3-Vector, face direction (faces are one-sided).
-    colour: str, hex colour.
-    points: list of vertex indices.
+    index: int, position of face in the parent's mesh.
+    direction: 3-Vector, face direction in world space (faces are one-sided).
+    colour: Colour.
+    points: tuple of vertex indices.
     verts: int, number of vertices.
-    centre: 3-Vector, centre of face.
+    centre: 3-Vector, centre of face in world space.
     """
-    def __init__(self, parent, direction, colour, *points):
-        self.parent = parent
-        self.direction = direction
-        self.colour = colour
-        self.points = points  # indices, not vectors
+    __slots__ = ('parent', 'index')
 
-        self.verts = len(self.points)
-        self.centre = 1/self.verts * sum(
-            self.parent.points[p] for p in self.points
-        )
+    def __init__(self, parent, index):
+        self.parent = parent
+        self.index = index
 
     def __eq__(self, other):
         return set(self.points) == set(other.points)
 
-    def add_offset(self, offset):
-        """
-        Offset all indices in self.points by a number.
-        :param offset: int
-        """
-        self.points = [p + offset for p in self.points]
+    @property
+    def direction(self):
+        return self.parent.model @ self.parent.mesh.face_direction(self.index)
 
-    def move_by(self, pos):
-        """
-        Move face by an offset vector.
-        :param pos: Vector
-        """
-        self.centre += pos
+    @property
+    def colour(self):
+        return self.parent.mesh.face_colour(self.index)
 
-    def transform(self, m):
-        """
-        Preform linear matrix transformation on face.
-        :param m: Matrix
-        """
-        self.direction = m @ self.direction
-        self.centre = m @ self.centre
+    @property
+    def points(self):
+        return self.parent.mesh.face_points(self.index)
 
-    def tri_points(self, i):
-        return (
-            self.points[0],
-            self.points[i+1],
-            self.points[i+2]
-        )
+    @property
+    def verts(self):
+        return len(self.points)
+
+    @property
+    def centre(self):
+        return self.parent.model @ self.parent.mesh.face_centre(self.index) + self.parent.offset
 
     def tri_iter(self):
         """Returns generator of face's triangles."""
-        return (self.tri_points(i) for i in range(self.verts-2))
-    
-    def copy(self):
-        return Face(
-            self.parent,
-            self.direction,
-            self.colour,
-            *self.points,
-        )
+        return self.parent.mesh.tri_iter(self.index)
 
 
 class Shape:
     """
-    Stores vertices as Vectors and combines them with Face objects.
+    Stores vertices and faces in a Mesh, placed in the world by a model transform.
+
+    The mesh stays in model space. Moving and transforming the shape only
+    updates the model matrix and offset, a vertex p of the mesh is at
+    model @ p + offset in the world. Renderers fold that into the camera
+    transform (see Projector.local), materialise writes it into the mesh.
 
+    shared_mesh() returns the class's Mesh, built once and shared.
     move_to(self, pos) moves Shape to a location (using achor point).
     move_by(self, pos) moves Shape by a vector.
     transform(self, m) allows matrix transformation of each vertex.
-    optimise(self) removes redundant vertices/faces.
-
-    points: list of 3-Vectors, vertices of shape.
-    faces: list of Faces.
+    materialise(self) applies the model transform to the mesh itself.
+    optimise(self, tolerance) removes redundant vertices/faces.
+
+    mesh: Mesh with the shape's vertices and faces, in model space.
+    model: Matrix3, linear part of the model transform.
+    offset: Vector3, translation part of the model transform.
+    matrix: Matrix4, the whole model transform in one matrix.
+    bvh: BVH over the mesh's faces, in model space (built on request).
+    points: list of 3-Vectors, vertices of shape in world space (built on request).
+    faces: list of Faces (built on request).
     """
     POINTS = ((0,0,0),)  # first point is the 'anchor'
     FACES = ()
+    WELD_TOLERANCE = 1e-9  # points closer than this are the same point
+    _shared = {}  # Shape class -> Mesh, see shared_mesh
 
     def __init__(self, shift=V3.z, trans=M3.e):
         self.reset()
         self.move_to(shift)
         self.transform(trans)
 
+    @classmethod
+    def from_mesh(cls, mesh):
+        """
+        Wrap an existing Mesh (e.g. a loaded model) without POINTS/FACES.
+        :param mesh: Mesh
+        :return: Shape
+        """
+        shape = cls.__new__(cls)
+        shape.mesh = mesh
+        shape._bvh = None
+        shape.model = M3.e
+        shape.offset = V3.z
+        return shape
+
+    @classmethod
+    def build_mesh(cls):
+        """Creates Mesh from the class's tuples."""
+        return Mesh.build(
+            cls.POINTS,
+            ((d, Colour(c), p) for d, c, p in cls.FACES),
+        )
+
+    @classmethod
+    def shared_mesh(cls):
+        """
+        The class's Mesh, built on first use and then shared by everything
+        that asks (see spinny.instances). Don't change it.
+        :return: Mesh
+        """
+        mesh = Shape._shared.get(cls)
+        if mesh is None:
+            mesh = Shape._shared[cls] = cls.build_mesh()
+        return mesh
+
     @property
     def cur(self):  # anchor point
-        return self.points[0]
+        return self.model @ self.mesh.point(0) + self.offset
+
+    @property
+    def matrix(self):
+        return Matrix4.affine(self.model, self.offset)
+
+    @property
+    def bvh(self):
+        if self._bvh is None or self._bvh.mesh is not self.mesh:
+            self._bvh = BVH(self.mesh)
+        return self._bvh
+
+    @property
+    def points(self):
+        m = self.model
+        offset = self.offset
+        return [m @ self.mesh.point(i) + offset for i in range(self.mesh.vertex_count)]
+
+    @property
+    def faces(self):
+        return [Face(self, f) for f in range(self.mesh.face_count)]
 
     def reset(self):
-        """Creates Vector and Face objects from given tuples."""
-        self.points = [V(v) for v in self.POINTS]
-        self.faces = [Face(self, V(d), Colour(c), *p) for d, c, p in self.FACES]
+        """Creates Mesh from given tuples."""
+        self.mesh = self.build_mesh()
+        self._bvh = None
+        self.model = M3.e
+        self.offset = V3.z
 
     def move_to(self, pos):
         """
@@ -115,50 +170,141 @@ class Shape:
         Move Shape by an offset.
         :param pos: Vector
         """
-        self.points = [v + pos for v in self.points]
-        for f in self.faces:
-            f.move_by(pos)
+        self.offset = self.offset + pos
 
     def transform(self, m):
         """
         Preform linear matrix transformation on shape.
-        :param m: Matrix
+        Only composes the model transform, the mesh isn't touched.
+        :param m: Matrix3, or an affine Matrix4 to also move the shape
         """
-        self.points = [m@v for v in self.points]
-        for f in self.faces:
-            f.transform(m)
+        if m.size == (4, 4):
+            if not m.is_affine:
+                raise ValueError('Shape transforms have to be affine')
+            self.transform(m.linear)
+            self.move_by(m.translation)
+            return
+        self.model = m @ self.model
+        self.offset = m @ self.offset
         if m.det == 0:  # optimisation only needed if dimentions collapsed
+            self.materialise()
             self.optimise()
 
-    def optimise(self):
-        """Removes duplicate points and faces in the shape."""
-        seen_vects = []
-        changes = {}
-        offset = 0
-        for i, v in enumerate(self.points):
-            for j, w in enumerate(seen_vects):  # O(n^2)?
-                if v == w:
-                    changes[i] = j
-                    offset += 1
+    def materialise(self):
+        """Apply the model transform to the mesh, leaving an identity transform."""
+        if self.model is not M3.e:
+            m = self.matrix
+            self.mesh.transform(m)  # turns and moves in one pass
+            if self._bvh is not None:
+                self._bvh.transform(m)  # refits from the moved mesh if it must
+        elif self.offset is not V3.z:
+            self.mesh.move_by(self.offset)
+            if self._bvh is not None:
+                self._bvh.move_by(self.offset)
+        self.model = M3.e
+        self.offset = V3.z
+
+    def optimise(self, tolerance=None):
+        """
+        Removes duplicate points and faces in the shape.
+
+        Points closer than the tolerance are welded into the first of them.
+        Faces using the same points are merged, or both dropped if they
+        point in different directions (e.g. the wall between two cubes).
+        :param tolerance: float, weld distance (default WELD_TOLERANCE)
+        :return: (#points removed, #faces removed)
+        """
+        if tolerance is None:
+            tolerance = self.WELD_TOLERANCE
+        mesh = self.mesh
+        normals = mesh.normals
+        kept, changes = weld(mesh.coords, tolerance)
+
+        new_faces = []  # (points, face index) pairs, None once cancelled
+        seen_faces = {}  # frozenset of points -> position in new_faces
+        for f in range(mesh.face_count):
+            points = tuple(map(changes.__getitem__, mesh.face_points(f)))
+            key = frozenset(points)
+            if len(key) < 3:
+                continue
+            i = seen_faces.get(key)
+            if i is None:
+                seen_faces[key] = len(new_faces)
+                new_faces.append((points, f))
+                continue
+            g = new_faces[i][1]
+            if normals[3*f:3*f+3] != normals[3*g:3*g+3]:
+                new_faces[i] = None
+                del seen_faces[key]
+
+        new = Mesh()
+        new.coords = kept
+        for face in new_faces:
+            if face is None:
+                continue
+            points, f = face
+            new.index.extend(points)
+            new.offsets.append(len(new.index))
+            new.normals.extend(normals[3*f:3*f+3])
+            new.centres.extend(mesh.centres[3*f:3*f+3])
+            new.colour_ids.append(new.colour_id(mesh.face_colour(f)))
+        self.mesh = new
+        return (
+            mesh.vertex_count - new.vertex_count,
+            mesh.face_count - new.face_count,
+        )
+
+
+def weld(coords, tolerance):
+    """
+    Merge points closer than tolerance using a spatial hash.
+    :param coords: array('d'), x, y, z of each point
+    :param tolerance: float, 0 for exact matches only
+    :return: (array('d') of kept points, list mapping old to new indices)
+    """
+    kept = array('d')
+    changes = []
+    it = iter(coords)
+    if not tolerance:
+        seen = {}
+        for p in zip(it, it, it):
+            j = seen.get(p)
+            if j is None:
+                j = seen[p] = len(seen)
+                kept.extend(p)
+            changes.append(j)
+        return kept, changes
+
+    cells = {}  # grid cell -> indices of kept points in it
+    tol2 = tolerance * tolerance
+    for x, y, z in zip(it, it, it):
+        cx, cy, cz = floor(x/tolerance), floor(y/tolerance), floor(z/tolerance)
+        for cell in _neighbours(cx, cy, cz):
+            for j in cells.get(cell, ()):
+                dx = kept[3*j] - x
+                dy = kept[3*j+1] - y
+                dz = kept[3*j+2] - z
+                if dx*dx + dy*dy + dz*dz <= tol2:
                     break
             else:
-                seen_vects.append(v)
-                changes[i] = i - offset
-        self.points = seen_vects  # replace list with duplicates
-
-        new_faces = []
-        for face in self.faces:
-            face.points = list(map(changes.get, face.points))
-            if len(set(face.points)) < 3:
-                continue
-            if face in new_faces:
-                i = new_faces.index(face)
-                if face.direction != new_faces[i].direction:
-                    del new_faces[i]
                 continue
+            break
+        else:
+            j = len(kept) // 3
+            kept.extend((x, y, z))
+            cells.setdefault((cx, cy, cz), []).append(j)
+        changes.append(j)
+    return kept, changes
+
 
-            new_faces.append(face)
-        self.faces = new_faces
+def _neighbours(cx, cy, cz):
+    """Yields grid cell and the 26 around it, own cell first."""
+    yield (cx, cy, cz)
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            for dz in (-1, 0, 1):
+                if dx or dy or dz:
+                    yield (cx+dx, cy+dy, cz+dz)
 
 
 class ShapeCombination(Shape):
@@ -166,12 +312,8 @@ class ShapeCombination(Shape):
     def __init__(self, *shapes, shift=V3.z, trans=M3.e):
         self.reset()
         for shape in shapes:
-            offset = len(self.points)
-            self.points += shape.points
-            for f in shape.faces:
-                f.parent = self
-                f.add_offset(offset)
-            self.faces += shape.faces
+            shape.materialise()  # mesh into world space
+            self.mesh.extend(shape.mesh)
 
         self.optimise()
         self.move_to(shift)
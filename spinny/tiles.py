@@ -0,0 +1,134 @@
+"""
+Tile-parallel rasterisation.
+
+The frame is cut into tiles, triangles are binned into the tiles they
+touch, and a pool of worker processes rasterises the tiles straight into
+a colour+depth buffer in shared memory, so nothing is copied back.
+"""
+import atexit
+import os
+from math import floor
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+
+from spinny.raster import FrameBuffer
+
+
+def _attach(name, width, height, background):
+    """Wrap a shared memory block in a FrameBuffer."""
+    # spawned workers are handed the parent's resource tracker, attaching is safe
+    shm = SharedMemory(name)
+    return shm, _view(shm, width, height, background)
+
+
+def _view(shm, width, height, background):
+    n = width * height
+    colour = shm.buf[:3*n]
+    depth = shm.buf[3*n:11*n].cast('d')
+    return FrameBuffer(width, height, background, buffers=(colour, depth))
+
+
+_worker = None  # (SharedMemory, FrameBuffer) of this worker process
+
+
+def _init_worker(name, width, height, background):
+    global _worker
+    _worker = _attach(name, width, height, background)
+
+
+def _render_tile(task):
+    """Clear one tile and rasterise its triangles."""
+    box, triangles = task
+    fb = _worker[1]
+    fb.clear(box)
+    triangle = fb.triangle
+    for a, b, c, rgb in triangles:
+        triangle(a, b, c, rgb, box)
+    return len(triangles)
+
+
+class TileRenderer:
+    """
+    Rasterises frames in parallel on a persistent pool of processes.
+
+    render(self, triangles) draws a whole frame into self.framebuffer.
+    close(self) stops the workers and frees the shared memory.
+
+    width, height: ints, frame size in pixels.
+    workers: int, number of worker processes.
+    tile: int, tile side in pixels.
+    boxes: list of (left, top, right, bottom) of every tile.
+    framebuffer: FrameBuffer over the shared memory, for presenting.
+    """
+    def __init__(self, width, height, workers=None, tile=64, background=b'\x00\x00\x00'):
+        self.width = width
+        self.height = height
+        self.workers = workers or os.cpu_count()
+        self.tile = tile
+        self.columns = -(-width // tile)
+        self.rows = -(-height // tile)
+        self.boxes = [
+            (x, y, min(x+tile, width), min(y+tile, height))
+            for y in range(0, height, tile)
+            for x in range(0, width, tile)
+        ]
+
+        n = width * height
+        self._shm = SharedMemory(create=True, size=11*n)  # 3 colour + 8 depth
+        self.framebuffer = _view(self._shm, width, height, background)
+        self.framebuffer.clear()  # once, here: workers attach to it while others draw
+        # spawned, not forked: the app may already run its scene thread, and
+        # forking a process with threads can copy locks held mid-use
+        self._pool = get_context('spawn').Pool(
+            self.workers,
+            initializer=_init_worker,
+            initargs=(self._shm.name, width, height, background),
+        )
+        atexit.register(self.close)
+
+    def bin(self, triangles):
+        """
+        Sort triangles into the tiles their bounding boxes touch.
+        :param triangles: iterable of (a, b, c, rgb)
+        :return: list of triangle lists, one per tile
+        """
+        bins = [[] for _ in self.boxes]
+        tile = self.tile
+        last_col = self.columns - 1
+        last_row = self.rows - 1
+        for t in triangles:
+            (ax, ay, aw), (bx, by, bw), (cx, cy, cw) = t[:3]
+            if aw <= 0 or bw <= 0 or cw <= 0:
+                continue  # unprojected corner, near clipping normally removes these first
+            left = max(floor(min(ax, bx, cx) / tile), 0)
+            right = min(floor(max(ax, bx, cx) / tile), last_col)
+            top = max(floor(min(ay, by, cy) / tile), 0)
+            bottom = min(floor(max(ay, by, cy) / tile), last_row)
+            for row in range(top, bottom+1):
+                for col in range(left, right+1):
+                    bins[row*self.columns + col].append(t)
+        return bins
+
+    def render(self, triangles):
+        """
+        Draw a frame. Returns once every tile is done.
+        :param triangles: iterable of (a, b, c, rgb), corners as (x, y, 1/depth)
+        :return: FrameBuffer with the finished frame
+        """
+        tasks = list(zip(self.boxes, self.bin(triangles)))
+        chunks = max(len(tasks) // (4*self.workers), 1)  # some balancing, few round trips
+        self._pool.map(_render_tile, tasks, chunksize=chunks)
+        return self.framebuffer
+
+    def close(self):
+        if self._pool is None:
+            return
+        self._pool.terminate()
+        self._pool.join()
+        self._pool = None
+        self.framebuffer.colour.release()  # no views may outlive the block
+        self.framebuffer.depth.release()
+        self.framebuffer = None
+        self._shm.close()
+        self._shm.unlink()
+        atexit.unregister(self.close)
@@ -0,0 +1,111 @@
+import json
+from collections import deque
+from statistics import mean, quantiles
+from time import perf_counter
+
+
+class FrameTimer:
+    """
+    Times each stage of a frame with perf_counter, keeping recent frames.
+
+    begin(self) starts timing a frame.
+    lap(self, stage) charges the time since the last lap to a stage.
+    end(self) finishes the frame and returns its duration.
+    summary(self) returns min/avg/max of every stage.
+    export(self, fp) writes the kept frames as JSON lines.
+
+    stages: tuple of stage names, in pipeline order.
+    history: dict of stage name -> deque of ms, plus 'total'.
+    frames: deque of frame numbers, parallel to history.
+    counter: int, frames timed so far.
+    """
+    STAGES = (
+        'input',
+        'projection',
+        'culling',
+        'sort',
+        'shading',
+        'emit',
+        'spin',
+        'infobox',
+    )
+
+    def __init__(self, stages=STAGES, size=300):
+        self.stages = tuple(stages)
+        self.history = {s: deque(maxlen=size) for s in (*self.stages, 'total')}
+        self.frames = deque(maxlen=size)
+        self.counter = 0
+        self._current = dict.fromkeys(self.stages, 0.0)
+        self._start = self._last = None
+
+    def begin(self):
+        self._start = self._last = perf_counter()
+        for s in self._current:
+            self._current[s] = 0.0
+
+    def lap(self, stage):
+        """
+        Add time since the previous lap (or begin) to stage.
+        :param stage: str, one of self.stages
+        """
+        now = perf_counter()
+        self._current[stage] += (now - self._last) * 1000
+        self._last = now
+
+    def end(self):
+        """
+        Store the frame in the ring buffers.
+        :return: float, frame duration in ms
+        """
+        total = (perf_counter() - self._start) * 1000
+        for s, ms in self._current.items():
+            self.history[s].append(ms)
+        self.history['total'].append(total)
+        self.frames.append(self.counter)
+        self.counter += 1
+        return total
+
+    @property
+    def totals(self):
+        return self.history['total']
+
+    def summary(self):
+        """
+        :return: dict of stage -> (min, avg, max) ms over the kept frames
+        """
+        res = {}
+        for s, values in self.history.items():
+            if values:
+                res[s] = (min(values), sum(values) / len(values), max(values))
+        return res
+
+    def export(self, fp):
+        """
+        Write kept frames as JSON lines, one object per frame.
+        :param fp: writable text file
+        """
+        names = list(self.history)
+        for frame, *values in zip(self.frames, *self.history.values()):
+            record = {'frame': frame}
+            record.update(zip(names, values))
+            fp.write(json.dumps(record) + '\n')
+
+
+def percentiles(times):
+    """
+    :param times: list of frame times in ms
+    :return: dict with p50, p95, p99, min, mean and max
+    """
+    if len(times) > 1:
+        q = quantiles(times, n=100, method='inclusive')
+        p50, p95, p99 = q[49], q[94], q[98]
+    else:
+        p50 = p95 = p99 = times[0]
+    return {
+        'min': min(times),
+        'p50': p50,
+        'p95': p95,
+        'p99': p99,
+        'mean': mean(times),
+        'max': max(times),
+    }
@@ -0,0 +1,30 @@
+import unittest
+
+from spinny.common import M3
+from spinny.matrix import Matrix, Vector, Vector2, Vector3
+
+
+class AddTest(unittest.TestCase):
+    values = (
+        Vector((1, 2, 3, 4)),
+        Vector2((1, 2)),
+        Vector3((1, 2, 3)),
+        Matrix(((1, 2), (3, 4))),
+        M3.grow(2),
+    )
+
+    def test_sum(self):
+        for x in self.values:
+            self.assertEqual(sum([x, x])._value, (x + x)._value)
+
+    def test_scalars_rejected(self):
+        for x in self.values:
+            for scalar in (5, 5.0):
+                with self.assertRaises(TypeError):
+                    x + scalar
+                with self.assertRaises(TypeError):
+                    scalar + x
+
+
+if __name__ == '__main__':
+    unittest.main()
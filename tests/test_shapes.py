@@ -0,0 +1,42 @@
+import unittest
+
+from spinny.bvh import BVH
+from spinny.common import M3
+from spinny.matrix import Vector3
+from spinny.shapes import Cube, ShapeCombination
+
+
+class MaterialiseTest(unittest.TestCase):
+    def grid(self):
+        shape = ShapeCombination(*(Cube(Vector3((3*i, 2*(i%3), 0))) for i in range(8)))
+        shape.move_by(Vector3((5, 0, 0)))
+        return shape
+
+    def test_bvh_matches_fresh_after_grow(self):
+        shape = self.grid()
+        shape.transform(M3.grow(2))
+        shape.bvh  # built before the mesh is moved
+        shape.materialise()
+        fresh = BVH(shape.mesh)
+        self.assertEqual(list(shape.bvh.order), list(fresh.order))
+        self.assertEqual(list(shape.bvh.centres), list(fresh.centres))
+        self.assertEqual(list(shape.bvh.radii), list(fresh.radii))
+
+    def test_bvh_bounds_after_rotation(self):
+        shape = self.grid()
+        shape.transform(M3.z_rot(0.3))
+        bvh = shape.bvh
+        shape.materialise()
+        mesh = shape.mesh
+        for n in range(bvh.node_count):
+            if bvh.right[n] >= 0:
+                continue
+            centre = Vector3(tuple(bvh.centres[3*n:3*n+3]))
+            for f in bvh.order[bvh.start[n]:bvh.start[n]+bvh.count[n]]:
+                for p in mesh.face_points(f):
+                    point = Vector3(tuple(mesh.coords[3*p:3*p+3]))
+                    self.assertLessEqual((point - centre).length, bvh.radii[n] + 1e-9)
+
+
+if __name__ == '__main__':
+    unittest.main()
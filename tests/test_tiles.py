@@ -0,0 +1,39 @@
+import random
+import unittest
+
+from spinny.raster import FrameBuffer
+from spinny.tiles import TileRenderer
+
+
+def triangles(count, width, height, seed=0):
+    rnd = random.Random(seed)
+    result = []
+    for _ in range(count):
+        x, y = rnd.uniform(0, width), rnd.uniform(0, height)
+        corners = tuple(
+            (x + rnd.uniform(-60, 60), y + rnd.uniform(-60, 60), rnd.uniform(0.1, 1))
+            for _ in range(3)
+        )
+        result.append(corners + (bytes(rnd.randrange(256) for _ in range(3)),))
+    return result
+
+
+class TileRendererTest(unittest.TestCase):
+    def test_pool_matches_one_process(self):
+        width, height = 320, 240
+        frame = triangles(400, width, height)
+        single = FrameBuffer(width, height)
+        for a, b, c, rgb in frame:
+            single.triangle(a, b, c, rgb)
+
+        renderer = TileRenderer(width, height, workers=3, tile=32)
+        try:
+            for _ in range(2):  # the first frame races the workers starting up
+                fb = renderer.render(frame)
+                self.assertEqual(bytes(fb.colour), bytes(single.colour))
+        finally:
+            renderer.close()
+
+
+if __name__ == '__main__':
+    unittest.main()